@@ -0,0 +1,163 @@
+import enum
+import heapq
+import itertools
+import math
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from api.exceptions import AdmissionRejected
+from core.tools import span
+
+SCAN_STATUS_ROUTE = re.compile(r'scans/[^/]+')
+RESOURCE_ID = re.compile(r'[0-9a-fA-F-]{8,}')
+BULK_LISTING_ROUTES = ('targets', 'scans', 'reports', 'exports', 'vulnerabilities')
+
+
+class RequestPriority(enum.IntEnum):
+    HIGH = 0
+    NORMAL = 1
+    LOW = 2
+
+
+_priority_override: ContextVar[RequestPriority | None] = ContextVar('upstream_priority', default=None)
+
+
+@contextmanager
+def upstream_priority(priority: RequestPriority | None):
+    """ Admit all upstream requests made inside the block with the given priority """
+    token = _priority_override.set(priority)
+    try:
+        yield
+    finally:
+        _priority_override.reset(token)
+
+
+def route_key(path: str) -> str:
+    """ Group a request path into a route used for rate limiting, e.g. `scans/<id>` -> `scans/{id}` """
+    route = path.split('?')[0].strip('/')
+    parts = route.split('/')
+    if len(parts) > 1 and parts[1] == 'download':
+        return f'{parts[0]}/download'
+    return '/'.join('{id}' if RESOURCE_ID.fullmatch(part) else part for part in parts)
+
+
+def classify_request(method: str, path: str) -> RequestPriority:
+    """ Logins and scan status polls go first, report downloads and bulk listings go last """
+    route = path.split('?')[0].strip('/')
+    if route in ('', 'me', 'me/login'):
+        return RequestPriority.HIGH
+    if method == 'GET' and SCAN_STATUS_ROUTE.fullmatch(route):
+        return RequestPriority.HIGH
+    if route_key(route).endswith('/download') or (method == 'GET' and route in BULK_LISTING_ROUTES):
+        return RequestPriority.LOW
+    return RequestPriority.NORMAL
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def reserve(self) -> float:
+        """ Take one token and return how long the caller has to wait for it """
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def cancel(self):
+        self.tokens += 1
+
+
+class AdmissionController:
+    """
+    Admission layer in front of the Acunetix service: a global concurrency cap with a bounded priority queue
+    and per-route token buckets. Overflow is rejected fast with `AdmissionRejected` instead of piling up upstream.
+    The limits apply to one process, every worker of the multi-process mode has its own controller.
+
+    Args:
+        max_concurrency: Maximum number of simultaneous upstream requests.
+        max_queue: Maximum number of requests waiting for a free slot.
+        queue_timeout: Maximum time in seconds a request waits for a free slot.
+        rate: Allowed requests per second for every route (0 - no rate limit).
+        burst: Token bucket size for every route (defaults to `rate`).
+        max_rate_wait: Maximum time in seconds a request waits for a route token.
+    """
+
+    def __init__(self,
+                 max_concurrency: int = 8,
+                 max_queue: int = 64,
+                 queue_timeout: float = 10.0,
+                 rate: float = 0.0,
+                 burst: float = None,
+                 max_rate_wait: float = 2.0):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.rate = rate
+        self.burst = burst or max(rate, 1.0)
+        self.max_rate_wait = max_rate_wait
+        self._active = 0
+        self._waiters: list[tuple[int, int]] = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._buckets: dict[str, TokenBucket] = {}
+        self._buckets_lock = threading.Lock()
+
+    @contextmanager
+    def admit(self, method: str, path: str):
+        with span('admission'):
+            self._wait_for_token(route=route_key(path))
+            priority = _priority_override.get()
+            self._acquire(priority=classify_request(method=method, path=path) if priority is None else priority)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _wait_for_token(self, route: str):
+        if self.rate <= 0:
+            return
+        with self._buckets_lock:
+            bucket = self._buckets.setdefault(route, TokenBucket(rate=self.rate, burst=self.burst))
+            delay = bucket.reserve()
+            if delay > self.max_rate_wait:
+                bucket.cancel()
+                raise AdmissionRejected(f'Rate limit exceeded for {route}', status_code=429,
+                                        retry_after=math.ceil(delay))
+        if delay:
+            time.sleep(delay)
+
+    def _acquire(self, priority: RequestPriority):
+        with self._condition:
+            if self._active < self.max_concurrency and not self._waiters:
+                self._active += 1
+                return
+            if len(self._waiters) >= self.max_queue:
+                raise AdmissionRejected('Upstream queue is full', status_code=503, retry_after=1)
+            entry = (priority.value, next(self._sequence))
+            heapq.heappush(self._waiters, entry)
+            deadline = time.monotonic() + self.queue_timeout
+            while not (self._waiters[0] == entry and self._active < self.max_concurrency):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._waiters.remove(entry)
+                    heapq.heapify(self._waiters)
+                    self._condition.notify_all()
+                    raise AdmissionRejected('Timed out waiting for an upstream slot', status_code=503,
+                                            retry_after=math.ceil(self.queue_timeout))
+                self._condition.wait(remaining)
+            heapq.heappop(self._waiters)
+            self._active += 1
+            self._condition.notify_all()
+
+    def _release(self):
+        with self._condition:
+            self._active -= 1
+            self._condition.notify_all()
@@ -1,24 +1,36 @@
 import json
 from abc import ABC
-from typing import NoReturn
+from typing import NoReturn, TYPE_CHECKING
 
-from api.core import AcunetixCoreAPI
+from api.admission import AdmissionController
+from api.circuit_breaker import CircuitBreaker
+from api.core import AcunetixCoreAPI, DEFAULT_TIMEOUT
 from api.mixins.exports import ExportsMixin
 from api.mixins.reports import ReportMixin
 from api.mixins.scans import ScanMixin
 from api.mixins.targets import TargetMixin
+from api.mixins.vulnerabilities import VulnerabilitiesMixin
 from core.tools import timed_print
 
+if TYPE_CHECKING:
+    from core.state import SessionStore
+
 
 class AcunetixAPI(AcunetixCoreAPI,
                   TargetMixin,
                   ScanMixin,
                   ReportMixin,
                   ExportsMixin,
+                  VulnerabilitiesMixin,
                   ABC):
 
-    def __init__(self, username: str, password: str, host: str, port: int, secure: bool):
-        super().__init__(username=username, password=password, host=host, port=port, secure=secure)
+    def __init__(self, username: str, password: str, host: str, port: int, secure: bool,
+                 admission: AdmissionController = None, session_store: "SessionStore" = None,
+                 circuit_breaker: CircuitBreaker = None, scheme: str = 'https',
+                 timeout: tuple[float, float] = DEFAULT_TIMEOUT):
+        super().__init__(username=username, password=password, host=host, port=port, secure=secure,
+                         admission=admission, session_store=session_store, circuit_breaker=circuit_breaker,
+                         scheme=scheme, timeout=timeout)
         self.test_connection()
         self._login()
         self.update_profile()
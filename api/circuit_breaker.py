@@ -0,0 +1,102 @@
+import enum
+import math
+import threading
+import time
+from collections import deque
+
+from api.exceptions import CircuitOpenError
+from core.tools import timed_print
+
+
+class CircuitStates(enum.Enum):
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker around the Acunetix service. Failed (connection errors, 5xx) and slow calls are counted
+    in a sliding window; when their share reaches the threshold the circuit opens and calls fail fast with
+    `CircuitOpenError`. After `open_seconds` a limited number of probe calls is let through (half-open):
+    a successful probe closes the circuit, a failed one opens it again.
+    The state is kept per process, every worker of the multi-process mode trips its own breaker.
+
+    Args:
+        failure_rate_threshold: Share of failed calls in the window which opens the circuit.
+        slow_call_ms: Calls slower than this are counted as failures.
+        window_size: Number of the last calls taken into account.
+        min_calls: Minimum number of calls in the window before the failure rate is evaluated.
+        open_seconds: Time the circuit stays open before probing.
+        half_open_probes: Number of simultaneous probe calls in the half-open state.
+    """
+
+    def __init__(self,
+                 failure_rate_threshold: float = 0.5,
+                 slow_call_ms: float = 30000,
+                 window_size: int = 20,
+                 min_calls: int = 5,
+                 open_seconds: float = 15,
+                 half_open_probes: int = 1):
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_ms = slow_call_ms
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self.state = CircuitStates.CLOSED
+        self._outcomes: deque[bool] = deque(maxlen=window_size)
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._lock = threading.Lock()
+
+    @property
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self._opened_at + self.open_seconds - time.monotonic()))
+
+    def before_call(self):
+        """ Raises `CircuitOpenError` if the call must not be sent """
+        with self._lock:
+            if self.state == CircuitStates.CLOSED:
+                return
+            if self.state == CircuitStates.OPEN:
+                if time.monotonic() - self._opened_at < self.open_seconds:
+                    raise CircuitOpenError('Acunetix service is unavailable', status_code=503,
+                                           retry_after=self.retry_after)
+                self._set_state(CircuitStates.HALF_OPEN)
+            if self._probes_in_flight >= self.half_open_probes:
+                raise CircuitOpenError('Acunetix service is recovering', status_code=503, retry_after=1)
+            self._probes_in_flight += 1
+
+    def cancel(self):
+        """ The call allowed by `before_call` was not sent """
+        with self._lock:
+            if self.state == CircuitStates.HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+
+    def record(self, is_failure: bool):
+        with self._lock:
+            if self.state == CircuitStates.HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+                if is_failure:
+                    self._open()
+                else:
+                    self._outcomes.clear()
+                    self._set_state(CircuitStates.CLOSED)
+                return
+            self._outcomes.append(is_failure)
+            if self.state == CircuitStates.CLOSED and len(self._outcomes) >= self.min_calls:
+                if sum(self._outcomes) / len(self._outcomes) >= self.failure_rate_threshold:
+                    self._open()
+
+    def record_response(self, status_code: int, elapsed_ms: float):
+        self.record(is_failure=status_code >= 500 or elapsed_ms >= self.slow_call_ms)
+
+    def _open(self):
+        self._opened_at = time.monotonic()
+        self._probes_in_flight = 0
+        self._set_state(CircuitStates.OPEN)
+
+    def _set_state(self, state: CircuitStates):
+        if state != self.state:
+            timed_print(f'Acunetix circuit breaker: {self.state.value} -> {state.value}')
+            self.state = state
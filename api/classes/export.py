@@ -10,3 +10,11 @@ class AcunetixExportReport(AcunetixReport):
     @property
     def download_json_name(self) -> str:
         return self.download_json.split('/')[-1]
+
+    @property
+    def download_csv(self) -> str:
+        return self._download_link_name('csv')
+
+    @property
+    def download_csv_name(self) -> str:
+        return self.download_csv.split('/')[-1]
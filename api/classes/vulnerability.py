@@ -0,0 +1,36 @@
+class AcunetixVulnerability:
+    def __init__(self,
+                 vuln_id: str,
+                 severity: int,
+                 vt_id: str,
+                 vt_name: str,
+                 target_id: str,
+                 affects_url: str = '',
+                 affects_detail: str = '',
+                 status: str = '',
+                 confidence: int = 0,
+                 criticality: int = 10,
+                 last_seen: str = None,
+                 tags: list[str] = None,
+                 scan_id: str = None,
+                 result_id: str = None):
+        self.vuln_id = vuln_id
+        self.severity = severity
+        self.vt_id = vt_id
+        self.vt_name = vt_name
+        self.target_id = target_id
+        self.affects_url = affects_url
+        self.affects_detail = affects_detail
+        self.status = status
+        self.confidence = confidence
+        self.criticality = criticality
+        self.last_seen = last_seen
+        self.tags = tags or []
+        self.scan_id = scan_id
+        self.result_id = result_id
+
+    def to_dict(self) -> dict:
+        return dict(self.__dict__)
+
+    def __str__(self) -> str:
+        return f'Vulnerability {self.vuln_id} ({self.vt_name}) at {self.affects_url}'
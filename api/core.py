@@ -1,11 +1,19 @@
 import hashlib
 import json
-from typing import NoReturn
+import time
+from contextlib import ExitStack
+from typing import Callable, NoReturn, TYPE_CHECKING
 
 import requests
 import urllib3
 
-from core.tools import timed_print
+from api.admission import AdmissionController, route_key
+from api.circuit_breaker import CircuitBreaker
+from api.exceptions import CircuitOpenError, ProxyConfigurationError
+from core.tools import timed_print, logger, span, traffic_recorder
+
+if TYPE_CHECKING:
+    from core.state import SessionStore
 
 def handle_http_errors(status_codes, fixing_function):
     def decorator(func):
@@ -13,7 +21,7 @@ def handle_http_errors(status_codes, fixing_function):
             response = func(*args, **kwargs)
             if response.status_code in status_codes:
                 # Retry the request
-                print(f"Retrying request due to status code: {response.status_code}")
+                logger.warning(f"Retrying request due to status code: {response.status_code}")
                 fixing_function()
                 response = func(*args, **kwargs)
             return response
@@ -23,14 +31,40 @@ def handle_http_errors(status_codes, fixing_function):
     return decorator
 
 
+# headers of the login response which describe that response itself and must not be sent with the requests
+RESPONSE_ONLY_HEADERS = frozenset({
+    'connection', 'keep-alive', 'proxy-authenticate', 'proxy-connection', 'te', 'trailer', 'transfer-encoding',
+    'upgrade', 'content-length', 'content-type', 'content-encoding', 'content-range', 'content-md5', 'date',
+    'server', 'set-cookie', 'vary', 'etag', 'last-modified', 'expires', 'cache-control', 'pragma', 'age',
+})
+
+
+DEFAULT_TIMEOUT = (5.0, 60.0)
+
+
+def session_headers(headers) -> dict:
+    """ Login response headers which are kept in the session (the authentication ones) """
+    return {name: value for name, value in headers.items() if name.lower() not in RESPONSE_ONLY_HEADERS}
+
+
 class AcunetixCoreAPI:
 
-    def __init__(self, username: str, password: str, host: str, port: int, secure: bool):
+    def __init__(self, username: str, password: str, host: str, port: int, secure: bool,
+                 admission: AdmissionController = None, session_store: "SessionStore" = None,
+                 circuit_breaker: CircuitBreaker = None, scheme: str = 'https',
+                 timeout: tuple[float, float] = DEFAULT_TIMEOUT):
         self.username = username
         self.password = password
         self.host = host
         self.port = port
         self.secure = secure
+        self.scheme = scheme
+        # (connect, read) seconds: a hung Acunetix fails the call and is counted by the circuit breaker
+        self.timeout = timeout
+        self.admission = admission or AdmissionController()
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        self.session_store = session_store
+        self.session_version = 0
         self.session = self._init_session()
 
     @property
@@ -51,7 +85,7 @@ class AcunetixCoreAPI:
 
     @property
     def api_url(self) -> str:
-        return f'https://{self.host}:{self.port}/api/v1/'
+        return f'{self.scheme}://{self.host}:{self.port}/api/v1/'
 
     @property
     def hash_password(self) -> str:
@@ -71,12 +105,33 @@ class AcunetixCoreAPI:
         urllib3.disable_warnings()
         session = requests.Session()
         session.verify = self.secure
+        # connections are used by the concurrent request threads, up to the admission concurrency
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=max(self.admission.max_concurrency, 10))
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
         return session
 
     def _login(self) -> NoReturn:
+        if not self.session_store:
+            self._login_upstream()
+            return
+        if token := self.session_store.begin_login(self.session_version):
+            headers, cookies = {}, {}
+            try:
+                headers, cookies = self._login_upstream()
+            finally:
+                self.session_version = self.session_store.finish_login(token, headers, cookies)
+        else:
+            self.session_version, headers, cookies = self.session_store.get_session()
+            self._update_session(headers=self.headers_json)
+            self._update_session(headers=headers, cookies=cookies)
+
+    def _login_upstream(self) -> (dict, dict):
         self._update_session(headers=self.headers_json)
-        response = self.post_request(path='me/login', data=self.auth_data)
-        self._update_session(headers=response.headers, cookies=response.cookies)
+        response = self.session.post(f'{self.api_url}me/login', data=self.auth_data, timeout=self.timeout)
+        headers = session_headers(response.headers)
+        self._update_session(headers=headers, cookies=response.cookies)
+        return headers, requests.utils.dict_from_cookiejar(response.cookies)
 
     def _update_session(self, headers=None, cookies=None) -> NoReturn:
         if headers:
@@ -84,37 +139,87 @@ class AcunetixCoreAPI:
         if cookies:
             self.session.cookies.update(cookies)
 
-    def get_request(self, path: str) -> requests.Response:
-        path = f'{self.api_url}{path}'
-        response = self.session.get(path)
-        if response.status_code in [400, 401]:
-            self._login()
-            response = self.session.get(path)
+    def _send_request(self, method: str, path: str, can_retry: bool = True, **kwargs) -> requests.Response:
+        """ Send request through the circuit breaker and the admission control,
+        log in again and retry once on auth errors """
+        url = f'{self.api_url}{path}'
+        kwargs.setdefault('timeout', self.timeout)
+        self.circuit_breaker.before_call()
+        is_recorded = False
+        try:
+            with span(f'upstream {method} {route_key(path)}'), ExitStack() as admission_slot:
+                admission_slot.enter_context(self.admission.admit(method=method, path=path))
+                started = time.perf_counter()
+                try:
+                    response = self.session.request(method, url, **kwargs)
+                    if response.status_code in [400, 401]:
+                        self._login()
+                        if can_retry:
+                            # a streamed response keeps its connection until it is closed
+                            response.close()
+                            response = self.session.request(method, url, **kwargs)
+                except requests.RequestException:
+                    self.circuit_breaker.record(is_failure=True)
+                    is_recorded = True
+                    raise
+                if kwargs.get('stream'):
+                    # the body is read by the caller, the upstream slot stays taken until then
+                    self._hold_admission_slot(response=response, release=admission_slot.pop_all().close)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.circuit_breaker.record_response(status_code=response.status_code, elapsed_ms=elapsed_ms)
+            is_recorded = True
+        finally:
+            if not is_recorded:
+                # rejected by the admission control or interrupted by an error which is not an upstream failure
+                self.circuit_breaker.cancel()
+        logger.debug(f'Upstream response {response.status_code}',
+                     extra={'route': f'{method} {path}', 'upstream_ms': round(elapsed_ms, 1)})
+        if traffic_recorder.is_active:
+            is_streamed = kwargs.get('stream', False)
+            traffic_recorder.record_upstream(method=method, path=path, status=response.status_code,
+                                             content_type=response.headers.get('Content-Type'),
+                                             body=None if is_streamed else response.content,
+                                             elapsed_ms=elapsed_ms, is_streamed=is_streamed)
         return response
 
+    @staticmethod
+    def _hold_admission_slot(response: requests.Response, release: Callable[[], None]):
+        """ Release the admission slot of a streamed response when its body is consumed or it is closed
+        (`urllib3` releases the connection in both cases) """
+        release_conn = response.raw.release_conn
+
+        def release_slot():
+            try:
+                release_conn()
+            finally:
+                if response.raw.release_conn is release_slot:
+                    response.raw.release_conn = release_conn
+                    release()
+
+        response.raw.release_conn = release_slot
+
+    def get_request(self, path: str) -> requests.Response:
+        return self._send_request('GET', path)
+
+    def stream_get_request(self, path: str) -> requests.Response:
+        """ GET request whose body is not loaded: read it with `iter_content`/`raw` and close the response """
+        return self._send_request('GET', path, stream=True)
+
     def post_request(self, path: str, data) -> requests.Response:
-        path = f'{self.api_url}{path}'
-        response = self.session.post(path, data=data)
-        if response.status_code in [400, 401]:
-            self._login()
-            response = self.session.post(path, data=data)
-        return response
+        return self._send_request('POST', path, data=data)
+
+    def stream_body_request(self, method: str, path: str, data) -> requests.Response:
+        """ Send a streamed body (file-like object or chunks iterator). The body can not be replayed,
+        so after a re-login on auth errors the error response is returned to the caller to retry """
+        # the framing is set by `requests` from the body, never taken from the session headers
+        return self._send_request(method, path, can_retry=False, data=data,
+                                  headers={'Content-Length': None, 'Transfer-Encoding': None})
 
     def patch_request(self, path: str, data) -> requests.Response:
-        path = f'{self.api_url}{path}'
-        response = self.session.patch(path, data=data)
-        if response.status_code in [400, 401]:
-            self._login()
-            response = self.session.patch(path, data=data)
-        return response
+        return self._send_request('PATCH', path, data=data)
 
     def delete_request(self, path: str) -> requests.Response:
-        path = f'{self.api_url}{path}'
-        response = self.session.delete(path)
-        if response.status_code in [400, 401]:
-            self._login()
-            response = self.session.delete(path)
-        return response
+        return self._send_request('DELETE', path)
 
     def setup_proxy_configuration(self, target_id: str, host: str, port: int, protocol: str) -> NoReturn:
         """Configures proxy settings for a target.
@@ -141,7 +246,8 @@ class AcunetixCoreAPI:
             timed_print('Proxy settings changed successfully.')
         else:
             timed_print(f'Proxy settings have not been changed. Something went wrong. {resp.text}')
-            exit(1)
+            raise ProxyConfigurationError(f'Proxy settings of the target {target_id} have not been changed: '
+                                          f'{resp.status_code} {resp.text}')
 
     def test_connection(self) -> NoReturn:
         """Checking the connection to the Acunetix service. The service needs time to initialize.
@@ -153,12 +259,13 @@ class AcunetixCoreAPI:
             timed_print(f'Trying to connect to the Acunetix service ({self.api_url})... ')
             try:
                 self.get_request('')
-            except requests.exceptions.ConnectionError as e:
+            except (requests.exceptions.ConnectionError, CircuitOpenError) as e:
                 counter += 1
                 if counter > 10:
                     timed_print('Failed to connect to the Acunetix service.')
                     raise e
-                # time.sleep(3)
+                if isinstance(e, CircuitOpenError):
+                    time.sleep(e.retry_after)
                 continue
             timed_print('The connection to the Acunetix service has been successfully established.')
             break
@@ -0,0 +1,47 @@
+class AcunetixAPIError(Exception):
+    """Base error of the Acunetix API layer"""
+
+
+class UpstreamRejected(AcunetixAPIError):
+    """The request was not sent to the Acunetix service. The client should retry later."""
+
+    def __init__(self, message: str, status_code: int = 503, retry_after: int = 1):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class AdmissionRejected(UpstreamRejected):
+    """The request was rejected by the upstream admission control (rate limit or full queue)"""
+
+
+class CircuitOpenError(UpstreamRejected):
+    """The Acunetix service is considered unhealthy, requests fail fast until the recovery probe succeeds"""
+
+
+class SessionLoginTimeout(UpstreamRejected):
+    """Another worker is still logging in to the Acunetix service"""
+
+
+class NotFoundError(AcunetixAPIError):
+    """The requested Acunetix object does not exist"""
+
+
+class TargetCreationError(AcunetixAPIError):
+    """Acunetix refused to create a target"""
+
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class TargetDeletionError(AcunetixAPIError):
+    """Acunetix refused to delete a target"""
+
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class ProxyConfigurationError(AcunetixAPIError):
+    """Acunetix refused to change the target proxy settings"""
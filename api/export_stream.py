@@ -0,0 +1,146 @@
+import codecs
+import csv
+import json
+import re
+from typing import Any, Iterable, Iterator, TextIO
+
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+STRING = re.compile(r'"((?:[^"\\]|\\.)*)"', re.S)
+SCALAR = re.compile(r'[^ \t\n\r{}\[\],:"]+')
+COMPACT_THRESHOLD = 1024 * 1024
+DEFAULT_ARRAY_KEYS = frozenset({'vulnerabilities', 'locations'})
+
+
+class IncompleteData(Exception):
+    """More input is needed to parse the current token"""
+
+
+class JsonArrayItemsStream:
+    """
+    Incremental JSON parser which yields the items of the arrays stored under `array_keys` (at any depth)
+    without loading the whole document. Only the current item is kept in memory.
+
+    Args:
+        chunks: Raw JSON document chunks (bytes or str).
+        array_keys: Keys of the arrays whose items have to be emitted.
+    """
+
+    def __init__(self, chunks: Iterable[bytes | str], array_keys: Iterable[str] = DEFAULT_ARRAY_KEYS):
+        self.chunks = iter(chunks)
+        self.array_keys = set(array_keys)
+        self._decoder = codecs.getincrementaldecoder('utf-8-sig')()
+        self._json_decoder = json.JSONDecoder()
+        self._buffer = ''
+        self._pos = 0
+        self._is_eof = False
+        # frames: ['object', current key, is key expected] or ['array', collected key or None]
+        self._stack: list[list] = []
+
+    def __iter__(self) -> Iterator[tuple[str, Any]]:
+        while True:
+            try:
+                item = self._step()
+            except IncompleteData:
+                if not self._read():
+                    if self._stack:
+                        raise ValueError('Unexpected end of the JSON document')
+                    return
+                continue
+            if item is not None:
+                yield item
+
+    def _read(self) -> bool:
+        if self._is_eof:
+            return False
+        if self._pos > COMPACT_THRESHOLD:
+            self._buffer = self._buffer[self._pos:]
+            self._pos = 0
+        try:
+            chunk = next(self.chunks)
+        except StopIteration:
+            self._is_eof = True
+            self._buffer += self._decoder.decode(b'', final=True)
+            return True
+        self._buffer += self._decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+        return True
+
+    def _peek(self) -> str:
+        self._pos = WHITESPACE.match(self._buffer, self._pos).end()
+        if self._pos >= len(self._buffer):
+            raise IncompleteData
+        return self._buffer[self._pos]
+
+    def _step(self) -> tuple[str, Any] | None:
+        char = self._peek()
+        frame = self._stack[-1] if self._stack else None
+        if frame and frame[0] == 'array' and frame[1] and char not in ',]':
+            return frame[1], self._decode_value()
+        match char:
+            case '{':
+                self._stack.append(['object', None, True])
+            case '[':
+                key = frame[1] if frame and frame[0] == 'object' else None
+                self._stack.append(['array', key if key in self.array_keys else None])
+            case '}' | ']':
+                self._stack.pop()
+            case ',':
+                if frame and frame[0] == 'object':
+                    frame[2] = True
+            case ':':
+                pass
+            case '"':
+                match = STRING.match(self._buffer, self._pos)
+                if not match:
+                    raise IncompleteData
+                if frame and frame[0] == 'object' and frame[2]:
+                    frame[1] = json.loads(match.group(0))
+                    frame[2] = False
+                self._pos = match.end()
+                return None
+            case _:
+                match = SCALAR.match(self._buffer, self._pos)
+                if match.end() >= len(self._buffer) and not self._is_eof:
+                    raise IncompleteData
+                self._pos = match.end()
+                return None
+        self._pos += 1
+        return None
+
+    def _decode_value(self) -> Any:
+        if self._buffer[self._pos] not in '{["':
+            return self._decode_scalar()
+        try:
+            value, end = self._json_decoder.raw_decode(self._buffer, self._pos)
+        except json.JSONDecodeError:
+            if self._is_eof:
+                raise
+            raise IncompleteData
+        self._pos = end
+        return value
+
+    def _decode_scalar(self) -> Any:
+        """ A number or a literal is complete only when a delimiter follows it: `3.` continues as `3.25` """
+        match = SCALAR.match(self._buffer, self._pos)
+        if not match:
+            raise json.JSONDecodeError('Expecting value', self._buffer, self._pos)
+        if match.end() >= len(self._buffer) and not self._is_eof:
+            raise IncompleteData
+        value = json.loads(match.group(0))
+        self._pos = match.end()
+        return value
+
+
+def iter_csv_records(text_stream: TextIO) -> Iterator[dict]:
+    """ Yields CSV rows as dicts, one row at a time """
+    yield from csv.DictReader(text_stream)
+
+
+def write_ndjson(records: Iterable[dict], file_path: str) -> int:
+    """ Writes records as newline delimited JSON. Returns the number of written records """
+    count = 0
+    with open(file_path, 'w', encoding='utf-8') as file:
+        for record in records:
+            file.write(json.dumps(record, ensure_ascii=False))
+            file.write('\n')
+            count += 1
+    return count
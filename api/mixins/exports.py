@@ -1,13 +1,21 @@
+import io
 import json
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Iterator
 
 from api.classes.export import AcunetixExportReport
+from api.constants import ExportTypes
+from api.export_stream import JsonArrayItemsStream, iter_csv_records, write_ndjson
 
 if TYPE_CHECKING:
     from api.base import AcunetixAPI
 
 
 class ExportsMixin:
+    EXPORT_CHUNK_SIZE = 64 * 1024
+    CSV_RECORD_TYPES = {
+        ExportTypes.CSV_LOCATIONS.value: 'locations',
+        ExportTypes.CSV_VULNERABILITIES.value: 'vulnerabilities',
+    }
 
     def run_scan_export(self: "AcunetixAPI", scan_id: str, export_id: str) -> AcunetixExportReport:
         data = {
@@ -41,3 +49,43 @@ class ExportsMixin:
             status=created_export['status'],
             source=created_export.get('source', []),
         )
+
+    def stream_export(self: "AcunetixAPI", export: AcunetixExportReport) -> Iterator[dict]:
+        """Download a generated export and parse it incrementally from the socket.
+
+        JSON exports yield every vulnerability and location, CSV exports yield every row.
+        Every record gets a `record_type` field. Memory usage does not depend on the export size.
+
+        Args:
+            export: The generated export (JSON or CSV export type).
+
+        """
+
+        if export.template_id == ExportTypes.JSON.value:
+            link = export.download_json
+        elif export.template_id in self.CSV_RECORD_TYPES:
+            link = export.download_csv
+        else:
+            raise ValueError(f'Streaming is not supported for the export type {export.template_id}')
+        response = self.stream_get_request(path=link.removeprefix('/api/v1/'))
+        try:
+            response.raise_for_status()
+            if export.template_id == ExportTypes.JSON.value:
+                items = JsonArrayItemsStream(response.iter_content(chunk_size=self.EXPORT_CHUNK_SIZE))
+                for record_type, item in items:
+                    yield {'record_type': record_type, **item} if isinstance(item, dict) else \
+                        {'record_type': record_type, 'value': item}
+            else:
+                response.raw.decode_content = True
+                # urllib3 closes the raw stream at the end of the body, the wrapper still reads it after that
+                response.raw.auto_close = False
+                text_stream = io.TextIOWrapper(response.raw, encoding='utf-8-sig', newline='')
+                record_type = self.CSV_RECORD_TYPES[export.template_id]
+                for row in iter_csv_records(text_stream=text_stream):
+                    yield {'record_type': record_type, **row}
+        finally:
+            response.close()
+
+    def export_to_ndjson(self: "AcunetixAPI", export: AcunetixExportReport, file_path: str) -> int:
+        """ Stream the export into a NDJSON file. Returns the number of written records """
+        return write_ndjson(records=self.stream_export(export=export), file_path=file_path)
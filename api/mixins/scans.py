@@ -1,8 +1,10 @@
 import json
+from datetime import datetime
 from typing import TYPE_CHECKING
 
 from api import constants
 from api.classes.scan import AcunetixScan
+from api.exceptions import NotFoundError
 
 if TYPE_CHECKING:
     from api.base import AcunetixAPI
@@ -17,8 +19,26 @@ class ScanMixin:
 
     def get_scan(self: "AcunetixAPI", scan_id: str) -> AcunetixScan:
         request = self.get_request(f'scans/{scan_id}')
+        if request.status_code == 404:
+            raise NotFoundError(f'Scan {scan_id} is not found')
         return self.parse_scan(created_scan=request.json())
 
+    def get_scan_end_time(self: "AcunetixAPI", scan_id: str, result_id: str) -> float | None:
+        """ End time (unix timestamp) of a scan session taken from the results history of the scan """
+        response = self.get_request(f'scans/{scan_id}/results')
+        if response.status_code != 200:
+            return None
+        result = next((result for result in response.json().get('results', [])
+                       if result.get('result_id') == result_id), None)
+        return self.parse_date(result.get('end_date')) if result else None
+
+    @staticmethod
+    def parse_date(value: str | None) -> float | None:
+        try:
+            return datetime.fromisoformat(value).timestamp() if value else None
+        except ValueError:
+            return None
+
     @staticmethod
     def parse_scan(created_scan: dict) -> AcunetixScan:
         return AcunetixScan(
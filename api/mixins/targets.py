@@ -2,6 +2,7 @@ import json
 from typing import TYPE_CHECKING
 
 from api.classes.target import AcunetixTarget
+from api.exceptions import TargetCreationError
 from core.tools import timed_print
 
 if TYPE_CHECKING:
@@ -27,10 +28,9 @@ class TargetMixin:
         request = self.post_request(path='targets', data=data)
         if request.status_code != 201:
             timed_print(f'Fail to create target for the address: {address}.\n'
-                        f'Info: {request.text} Status code: {request.status_code}. Content: {request.content}'
-                        f'\nExit')
-            self.close_session()
-            exit(1)
+                        f'Info: {request.text} Status code: {request.status_code}. Content: {request.content}')
+            raise TargetCreationError(f'Fail to create target for the address: {address}',
+                                      status_code=request.status_code)
         target = self.parse_target(target_dict=request.json())
         timed_print(f'Target {target} for the address: {address} has been successfully created.')
         return target
@@ -0,0 +1,108 @@
+import json
+from typing import TYPE_CHECKING, Iterator
+from urllib.parse import urlencode
+
+from api.classes.scan import AcunetixScan
+from api.classes.scan_status import FINAL_ACUNETIX_STATUSES
+from api.classes.vulnerability import AcunetixVulnerability
+from core.tools import logger
+
+if TYPE_CHECKING:
+    from api.base import AcunetixAPI
+    from api.vulnerability_store import VulnerabilityStore
+
+
+class VulnerabilitiesMixin:
+    VULNERABILITIES_PAGE_SIZE = 100
+
+    def iter_scan_vulnerabilities(self: "AcunetixAPI",
+                                  scan_id: str,
+                                  result_id: str,
+                                  sort: str = None) -> Iterator[list[AcunetixVulnerability]]:
+        """Page through the vulnerabilities of a scan session.
+
+        Args:
+            scan_id: The scan identifier.
+            result_id: The scan result (session) identifier.
+            sort: Optional sort expression, e.g. `last_seen:desc`.
+
+        """
+
+        cursor = None
+        while True:
+            params = {'l': self.VULNERABILITIES_PAGE_SIZE}
+            if cursor:
+                params['c'] = cursor
+            if sort:
+                params['s'] = sort
+            response = self.get_request(f'scans/{scan_id}/results/{result_id}/vulnerabilities?{urlencode(params)}')
+            data = response.json()
+            yield [
+                self.parse_vulnerability(vulnerability=vulnerability, scan_id=scan_id, result_id=result_id)
+                for vulnerability in data.get('vulnerabilities', [])
+            ]
+            cursor = self._next_cursor(pagination=data.get('pagination') or {}, cursor=cursor)
+            if not cursor:
+                break
+
+    @staticmethod
+    def _next_cursor(pagination: dict, cursor: str | None) -> str | None:
+        if next_cursor := pagination.get('next_cursor'):
+            return next_cursor
+        cursors = [item for item in pagination.get('cursors') or [] if item]
+        return cursors[-1] if cursors and cursors[-1] != cursor else None
+
+    def sync_scan_vulnerabilities(self: "AcunetixAPI", scan: AcunetixScan, store: "VulnerabilityStore") -> int:
+        """Incrementally synchronize the current session vulnerabilities of a scan into the local store.
+
+        The scan is skipped when its session state did not change since the last sync. Running scans are
+        fetched newest first and paging stops at the first page without new or changed entries;
+        a scan in a final status gets one full pass and is not fetched again.
+        Returns the number of new or changed vulnerabilities.
+        """
+
+        session = scan.current_session
+        result_id = session.scan_session_id
+        if not result_id:
+            return 0
+        is_final = session.status in FINAL_ACUNETIX_STATUSES
+        fingerprint = json.dumps([result_id, session.status, session.severity_counts], sort_keys=True)
+        state = store.get_sync_state(scan_id=scan.scan_id)
+        is_same_session = bool(state) and state['result_id'] == result_id
+        if is_same_session and (state['is_complete'] or state['fingerprint'] == fingerprint):
+            return 0
+
+        watermark = state['watermark'] if is_same_session else None
+        newest_seen = watermark
+        changed_total = 0
+        for page in self.iter_scan_vulnerabilities(scan_id=scan.scan_id, result_id=result_id, sort='last_seen:desc'):
+            changed = store.upsert(vulnerabilities=page)
+            changed_total += changed
+            newest_seen = max([newest_seen or ''] + [item.last_seen or '' for item in page]) or None
+            is_page_old = watermark and all((item.last_seen or '') <= watermark for item in page)
+            if not is_final and not changed and is_page_old:
+                break
+        store.set_sync_state(scan_id=scan.scan_id, result_id=result_id, fingerprint=fingerprint,
+                             watermark=newest_seen, is_complete=is_final)
+        logger.debug(f'Synchronized {changed_total} vulnerabilities of scan {scan.scan_id}',
+                     extra={'target': scan.target_id})
+        return changed_total
+
+    @staticmethod
+    def parse_vulnerability(vulnerability: dict, scan_id: str = None, result_id: str = None) -> AcunetixVulnerability:
+        return AcunetixVulnerability(
+            vuln_id=vulnerability['vuln_id'],
+            severity=vulnerability.get('severity', 0),
+            vt_id=vulnerability.get('vt_id'),
+            vt_name=vulnerability.get('vt_name', ''),
+            target_id=vulnerability.get('target_id'),
+            affects_url=vulnerability.get('affects_url', ''),
+            affects_detail=vulnerability.get('affects_detail', ''),
+            status=vulnerability.get('status', ''),
+            confidence=vulnerability.get('confidence', 0),
+            criticality=vulnerability.get('criticality', 10),
+            last_seen=vulnerability.get('last_seen'),
+            tags=vulnerability.get('tags', []),
+            scan_id=scan_id,
+            result_id=result_id,
+        )
@@ -0,0 +1,121 @@
+import hashlib
+import json
+import sqlite3
+import threading
+from datetime import datetime
+
+from api.classes.vulnerability import AcunetixVulnerability
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS vulnerabilities (
+    vuln_id TEXT PRIMARY KEY,
+    scan_id TEXT NOT NULL,
+    result_id TEXT,
+    target_id TEXT,
+    severity INTEGER,
+    vt_id TEXT,
+    last_seen TEXT,
+    row_hash TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS vulnerabilities_scan ON vulnerabilities (scan_id, severity);
+CREATE INDEX IF NOT EXISTS vulnerabilities_target ON vulnerabilities (target_id, severity);
+CREATE INDEX IF NOT EXISTS vulnerabilities_severity ON vulnerabilities (severity);
+CREATE INDEX IF NOT EXISTS vulnerabilities_vt ON vulnerabilities (vt_id);
+CREATE TABLE IF NOT EXISTS scan_sync_state (
+    scan_id TEXT PRIMARY KEY,
+    result_id TEXT,
+    fingerprint TEXT,
+    watermark TEXT,
+    is_complete INTEGER NOT NULL DEFAULT 0,
+    synced_at TEXT
+);
+"""
+
+
+class VulnerabilityStore:
+    """
+    Local SQLite index of scan vulnerabilities. Rows are upserted only when their content changes
+    and the sync state of every scan is kept, so later polls can skip unchanged scans.
+
+    Args:
+        path: SQLite database file (`:memory:` for a temporary store).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.executescript(SCHEMA)
+
+    @staticmethod
+    def row_hash(vulnerability: AcunetixVulnerability) -> str:
+        return hashlib.sha1(json.dumps(vulnerability.to_dict(), sort_keys=True).encode()).hexdigest()
+
+    def get_sync_state(self, scan_id: str) -> sqlite3.Row | None:
+        with self._lock:
+            return self._connection.execute(
+                'SELECT * FROM scan_sync_state WHERE scan_id = ?', (scan_id,)
+            ).fetchone()
+
+    def set_sync_state(self, scan_id: str, result_id: str, fingerprint: str, watermark: str | None,
+                       is_complete: bool):
+        with self._lock, self._connection:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO scan_sync_state '
+                '(scan_id, result_id, fingerprint, watermark, is_complete, synced_at) VALUES (?, ?, ?, ?, ?, ?)',
+                (scan_id, result_id, fingerprint, watermark, int(is_complete), datetime.now().isoformat()),
+            )
+
+    def upsert(self, vulnerabilities: list[AcunetixVulnerability]) -> int:
+        """ Save the page of vulnerabilities. Returns the number of new or changed rows """
+        if not vulnerabilities:
+            return 0
+        hashes = {vulnerability.vuln_id: self.row_hash(vulnerability) for vulnerability in vulnerabilities}
+        with self._lock, self._connection:
+            placeholders = ', '.join('?' * len(hashes))
+            known_hashes = dict(self._connection.execute(
+                f'SELECT vuln_id, row_hash FROM vulnerabilities WHERE vuln_id IN ({placeholders})', list(hashes)
+            ).fetchall())
+            changed = [vulnerability for vulnerability in vulnerabilities
+                       if known_hashes.get(vulnerability.vuln_id) != hashes[vulnerability.vuln_id]]
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO vulnerabilities '
+                '(vuln_id, scan_id, result_id, target_id, severity, vt_id, last_seen, row_hash, data) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                [
+                    (vulnerability.vuln_id, vulnerability.scan_id, vulnerability.result_id, vulnerability.target_id,
+                     vulnerability.severity, vulnerability.vt_id, vulnerability.last_seen,
+                     hashes[vulnerability.vuln_id], json.dumps(vulnerability.to_dict()))
+                    for vulnerability in changed
+                ],
+            )
+        return len(changed)
+
+    def query(self,
+              scan_id: str = None,
+              target_id: str = None,
+              min_severity: int = None,
+              vt_id: str = None,
+              vuln_id: str = None,
+              limit: int = 100,
+              offset: int = 0) -> list[AcunetixVulnerability]:
+        conditions, params = [], []
+        for column, operator, value in (('scan_id', '=', scan_id), ('target_id', '=', target_id),
+                                        ('severity', '>=', min_severity), ('vt_id', '=', vt_id),
+                                        ('vuln_id', '=', vuln_id)):
+            if value is not None:
+                conditions.append(f'{column} {operator} ?')
+                params.append(value)
+        where = f'WHERE {" AND ".join(conditions)}' if conditions else ''
+        with self._lock:
+            rows = self._connection.execute(
+                f'SELECT data FROM vulnerabilities {where} ORDER BY severity DESC, vuln_id LIMIT ? OFFSET ?',
+                params + [limit, offset],
+            ).fetchall()
+        return [AcunetixVulnerability(**json.loads(row['data'])) for row in rows]
+
+    def close(self):
+        self._connection.close()
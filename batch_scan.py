@@ -0,0 +1,64 @@
+import argparse
+from typing import NoReturn
+
+from api import constants
+from api.base import AcunetixAPI
+from cli_arguments import acunetix_arguments
+from core.tools import configure_logging
+from scanner.orchestrator import Checkpoint, ScanOrchestrator
+
+
+def init_args():
+    parser = argparse.ArgumentParser(description='Run the whole Acunetix scan lifecycle for a list of addresses',
+                                     parents=[acunetix_arguments()])
+    parser.add_argument('-i', '--input', required=True, type=str, help='File with addresses, one per line')
+    parser.add_argument('-o', '--output-dir', type=str, default='reports', help='Directory for downloaded files')
+    parser.add_argument('-c', '--checkpoint', type=str, default='batch_scan_checkpoint.json',
+                        help='Checkpoint file used to resume an interrupted run')
+    parser.add_argument('-l', '--slots', type=int, default=1, help='Number of available license slots (targets)')
+    parser.add_argument('-dw', '--download-workers', type=int, default=2, help='Number of parallel downloads')
+    parser.add_argument('-pi', '--poll-interval', type=float, default=30, help='Scan status polling interval')
+    parser.add_argument('-st', '--scan-timeout', type=float, default=12 * 3600,
+                        help='Seconds to wait for a scan to finish, the target is deleted after that')
+    parser.add_argument('-at', '--artifact-timeout', type=float, default=600,
+                        help='Seconds to wait for a report or an export to be generated')
+    parser.add_argument('-pr', '--profile-id', type=str, default=constants.DEFAULT_PROFILE_ID, help='Scan profile')
+    parser.add_argument('-rt', '--report-template-id', type=str, default=constants.DEFAULT_REPORT_TEMPLATE_ID,
+                        help='Report template')
+    parser.add_argument('-et', '--export-id', type=str, default=constants.ExportTypes.JSON.value, help='Export type')
+    return parser.parse_args()
+
+
+def main() -> NoReturn:
+    arguments = init_args()
+    configure_logging(level=arguments.log_level)
+    with open(arguments.input) as file:
+        addresses = list(dict.fromkeys(line.strip() for line in file if line.strip()))
+    api = AcunetixAPI(
+        username=arguments.username,
+        password=arguments.password,
+        host=arguments.acunetix_host,
+        port=arguments.acunetix_port,
+        secure=arguments.secure,
+        scheme=arguments.acunetix_scheme,
+        timeout=(arguments.connect_timeout, arguments.read_timeout),
+    )
+    orchestrator = ScanOrchestrator(
+        api=api,
+        checkpoint=Checkpoint(file_path=arguments.checkpoint),
+        output_dir=arguments.output_dir,
+        profile_id=arguments.profile_id,
+        report_template_id=arguments.report_template_id,
+        export_id=arguments.export_id,
+        slots=arguments.slots,
+        download_workers=arguments.download_workers,
+        poll_interval=arguments.poll_interval,
+        scan_timeout=arguments.scan_timeout,
+        artifact_timeout=arguments.artifact_timeout,
+    )
+    orchestrator.run(addresses=addresses)
+    api.close_session()
+
+
+if __name__ == '__main__':
+    main()
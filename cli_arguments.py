@@ -1,17 +1,68 @@
 import argparse
 
 
-def init_args():
-    parser = argparse.ArgumentParser()
+def acunetix_arguments() -> argparse.ArgumentParser:
+    """ Parent parser with the Acunetix connection and logging arguments shared by the entry points """
+    parser = argparse.ArgumentParser(add_help=False)
     parser.add_argument('-u', '--username', required=True, type=str, help='Acunetix user name')
     parser.add_argument('-p', '--password', required=True, type=str, help='Acunetix user password')
     parser.add_argument('-ah', '--acunetix-host', required=True, type=str, help='Acunetix API host')
     parser.add_argument('-ap', '--acunetix-port', required=True, type=int, help='Acunetix API port')
+    parser.add_argument('-as', '--acunetix-scheme', type=str, default='https', choices=['https', 'http'],
+                        help='Acunetix API scheme (http is used with the local stand-in of replay_trace.py)')
     parser.add_argument('-s', '--secure', type=bool, default=False, help='Session is secure')
+    parser.add_argument('-tc', '--connect-timeout', type=float, default=5,
+                        help='Seconds to wait for a connection to Acunetix')
+    parser.add_argument('-tr', '--read-timeout', type=float, default=60,
+                        help='Seconds to wait for Acunetix to answer (between received bytes)')
+    parser.add_argument('-ll', '--log-level', type=str, default='INFO',
+                        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'], help='Logging level')
+    return parser
+
+
+def init_args():
+    parser = argparse.ArgumentParser(parents=[acunetix_arguments()])
     parser.add_argument('-px', '--proxy', required=False, type=str, help='Proxy settings')
     parser.add_argument('-sh', '--listen-host', type=str, default='0.0.0.0', help='Listening hosts')
     parser.add_argument('-sp', '--listen-port', type=int, default=3444, help='Listening ports')
+    parser.add_argument('-uc', '--upstream-concurrency', type=int, default=8,
+                        help='Maximum number of simultaneous requests to Acunetix (per worker process)')
+    parser.add_argument('-uq', '--upstream-queue', type=int, default=64,
+                        help='Maximum number of requests waiting for Acunetix (per worker process)')
+    parser.add_argument('-ur', '--upstream-rate', type=float, default=0,
+                        help='Allowed requests per second to every Acunetix route per worker process '
+                             '(0 - unlimited)')
+    parser.add_argument('-ub', '--upstream-burst', type=float, default=None,
+                        help='Burst size of the per-route rate limit')
+    parser.add_argument('-w', '--workers', type=int, default=1, help='Number of server worker processes')
+    parser.add_argument('-ss', '--state-socket', type=str, default='/tmp/acunetix_fake_client.sock',
+                        help='Unix socket of the shared state service (used with several workers)')
+    parser.add_argument('-vd', '--vulnerabilities-db', type=str, default='vulnerabilities.sqlite3',
+                        help='SQLite file of the local vulnerabilities index')
+    parser.add_argument('-sr', '--slow-request-ms', type=float, default=1000,
+                        help='Requests slower than this (milliseconds) are logged with their stages')
+    parser.add_argument('-pd', '--profile-dir', type=str, default='profiles', help='Directory for profiling stats')
+    parser.add_argument('-pe', '--profiling-endpoint', action='store_true',
+                        help='Enable the POST fake/profile endpoint which turns on the request profiler')
+    parser.add_argument('-cf', '--circuit-failure-rate', type=float, default=0.5,
+                        help='Share of failed Acunetix calls which opens the circuit breaker (every worker has its own)')
+    parser.add_argument('-co', '--circuit-open-seconds', type=float, default=15,
+                        help='Time the circuit breaker stays open before probing Acunetix again')
+    parser.add_argument('-rf', '--result-freshness-minutes', type=float, default=60,
+                        help='Completed scans are reused for the same address and profile during this time (0 - off)')
+    parser.add_argument('-rc', '--results-cache', type=str, default='scan_results_cache.json',
+                        help='File of the completed scans cache')
+    parser.add_argument('-cp', '--capture-file', type=str, default=None,
+                        help='Record downstream requests and Acunetix responses to this NDJSON trace '
+                             '(replayed by replay_trace.py)')
+    parser.add_argument('-cb', '--capture-body-limit', type=int, default=1024 * 1024,
+                        help='Bytes of a request body kept in the trace, longer bodies are truncated')
     return parser.parse_args()
 
 
-CLI_ARGUMENTS = init_args()
+def __getattr__(name: str):
+    # the proxy arguments are parsed on the first use, so the other entry points can import the shared parser
+    if name == 'CLI_ARGUMENTS':
+        globals()[name] = init_args()
+        return globals()[name]
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
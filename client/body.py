@@ -0,0 +1,135 @@
+from typing import BinaryIO, Iterator
+from email.message import Message
+
+CHUNK_SIZE = 64 * 1024
+
+
+class RequestBodyError(Exception):
+    """
+    The downstream client sent a malformed body or failed while sending it. It is a client side error:
+    unlike `OSError` it is not taken by `requests` for a failure of the upstream connection.
+    """
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _read(read, size: int) -> bytes:
+    try:
+        return read(size)
+    except OSError as e:
+        raise RequestBodyError(f'Request body can not be read: {e}', status_code=408) from e
+
+
+class BodyTee:
+    """ Copy of the read body for the traffic capture. Only the first `limit` bytes are kept """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.data = bytearray()
+        self.size = 0
+
+    @property
+    def is_truncated(self) -> bool:
+        return self.size > len(self.data)
+
+    def write(self, data: bytes):
+        self.size += len(data)
+        if (room := self.limit - len(self.data)) > 0:
+            self.data += data[:room]
+
+
+class LimitedReader:
+    """ File-like view of the first `length` bytes of a stream. `requests` sends it with a Content-Length """
+
+    def __init__(self, stream: BinaryIO, length: int, tee: BodyTee | None = None):
+        self.stream = stream
+        self.remaining = length
+        self.tee = tee
+
+    def __len__(self) -> int:
+        return self.remaining
+
+    def read(self, size: int = -1) -> bytes:
+        if self.remaining <= 0:
+            return b''
+        size = self.remaining if size is None or size < 0 else min(size, self.remaining)
+        data = _read(self.stream.read, size)
+        if not data:
+            raise RequestBodyError('Request body is shorter than its Content-Length')
+        self.remaining -= len(data)
+        if self.tee is not None:
+            self.tee.write(data)
+        return data
+
+
+class RequestBody:
+    """
+    Request body of the downstream client: Content-Length or chunked transfer encoding.
+    It can be read once, either buffered (`read`) or as a stream (`stream`).
+    A copy of the read body (its prefix for large bodies) is collected in `tee` when it is given (traffic capture).
+    Malformed or interrupted bodies raise `RequestBodyError`.
+    """
+
+    def __init__(self, rfile: BinaryIO, headers: Message, tee: BodyTee | None = None):
+        self.rfile = rfile
+        self.tee = tee
+        self.is_chunked = 'chunked' in (headers.get('Transfer-Encoding') or '').lower()
+        self.content_length_header = headers.get('Content-Length')
+
+    @property
+    def content_length(self) -> int:
+        try:
+            content_length = int(self.content_length_header or 0)
+        except ValueError:
+            content_length = -1
+        if content_length < 0:
+            raise RequestBodyError(f'Invalid Content-Length: {self.content_length_header}')
+        return content_length
+
+    def read(self) -> bytes:
+        if self.is_chunked:
+            return b''.join(self._iter_chunked())
+        content_length = self.content_length
+        if not content_length:
+            return b''
+        reader = LimitedReader(stream=self.rfile, length=content_length, tee=self.tee)
+        return b''.join(iter(lambda: reader.read(CHUNK_SIZE), b''))
+
+    def stream(self) -> LimitedReader | Iterator[bytes]:
+        """ Body for `requests`: a sized reader when the length is known, otherwise a chunks generator """
+        if self.is_chunked:
+            return self._iter_chunked()
+        return LimitedReader(stream=self.rfile, length=self.content_length, tee=self.tee)
+
+    def _iter_chunked(self) -> Iterator[bytes]:
+        while True:
+            size = self._read_chunk_size()
+            if size == 0:
+                # skip trailers
+                while _read(self.rfile.readline, 1024).strip():
+                    pass
+                return
+            while size > 0:
+                data = _read(self.rfile.read, min(size, CHUNK_SIZE))
+                if not data:
+                    raise RequestBodyError('Unexpected end of the chunked request body')
+                size -= len(data)
+                if self.tee is not None:
+                    self.tee.write(data)
+                yield data
+            if _read(self.rfile.readline, 1024).strip():
+                raise RequestBodyError('Chunk data is longer than its size')
+
+    def _read_chunk_size(self) -> int:
+        size_line = _read(self.rfile.readline, 1024)
+        if not size_line:
+            raise RequestBodyError('Unexpected end of the chunked request body')
+        try:
+            size = int(size_line.split(b';', 1)[0].strip(), 16)
+        except ValueError:
+            raise RequestBodyError(f'Invalid chunk size line: {size_line[:64]!r}')
+        if size < 0:
+            raise RequestBodyError(f'Invalid chunk size: {size}')
+        return size
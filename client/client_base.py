@@ -1,13 +1,31 @@
+import contextvars
 import json
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from http import server
 from typing import Any
-from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
+from urllib.parse import parse_qs, urlencode
 
+import requests
+
+from api import constants
+from api.admission import AdmissionController, upstream_priority
 from api.base import AcunetixAPI
+from api.circuit_breaker import CircuitBreaker
+from api.classes.scan_status import AcunetixScanStatuses
+from api.exceptions import AcunetixAPIError, NotFoundError, UpstreamRejected
+from api.vulnerability_store import VulnerabilityStore
 from cli_arguments import CLI_ARGUMENTS
-from core.tools import timed_print
-from scanner.scanner_base import TargetsQueue
+from client.body import BodyTee, RequestBody, RequestBodyError
+from client.events import ScanEventsHub
+from client.routes import ROUTES, ProxyRequest
+from core import state
+from core.tools import (timed_print, logger, span, trace_request, request_profiler, current_request_id,
+                        traffic_recorder)
+from scanner.addresses import normalize_address
+from scanner.results_cache import ScanResultsCache
+from scanner.scanner_base import ClientTarget
 
 api = AcunetixAPI(
     username=CLI_ARGUMENTS.username,
@@ -15,99 +33,208 @@ api = AcunetixAPI(
     host=CLI_ARGUMENTS.acunetix_host,
     port=CLI_ARGUMENTS.acunetix_port,
     secure=CLI_ARGUMENTS.secure,
+    scheme=CLI_ARGUMENTS.acunetix_scheme,
+    timeout=(CLI_ARGUMENTS.connect_timeout, CLI_ARGUMENTS.read_timeout),
+    admission=AdmissionController(
+        max_concurrency=CLI_ARGUMENTS.upstream_concurrency,
+        max_queue=CLI_ARGUMENTS.upstream_queue,
+        rate=CLI_ARGUMENTS.upstream_rate,
+        burst=CLI_ARGUMENTS.upstream_burst,
+    ),
+    session_store=state.get_session_store(),
+    circuit_breaker=CircuitBreaker(
+        failure_rate_threshold=CLI_ARGUMENTS.circuit_failure_rate,
+        open_seconds=CLI_ARGUMENTS.circuit_open_seconds,
+    ),
 )
 
-targets_queue = TargetsQueue()
+targets_queue = state.get_targets_queue()
 targets_queue.fill_current_targets(targets=api.get_targets())
 
+BATCH_MAX_WORKERS = 8
+BATCH_MAX_PATHS = 100
+batch_executor = ThreadPoolExecutor(max_workers=BATCH_MAX_WORKERS, thread_name_prefix='batch')
+
+scan_events = ScanEventsHub(api=api, targets_queue=targets_queue)
+
+vulnerability_store = VulnerabilityStore(path=CLI_ARGUMENTS.vulnerabilities_db)
+
+results_cache = ScanResultsCache(file_path=CLI_ARGUMENTS.results_cache,
+                                 freshness_seconds=CLI_ARGUMENTS.result_freshness_minutes * 60)
+
+
+def handle_upstream_rejection(func):
+    """ Answer with an error instead of waiting when the request can not be served by Acunetix right now
+    (or can not be sent because of its malformed body) """
+    def wrapper(self: "Client", *args, **kwargs):
+        try:
+            return func(self, *args, **kwargs)
+        except RequestBodyError as e:
+            # the rest of the request can not be told apart from the next one
+            timed_print(f'Bad request body: {e}')
+            self.close_connection = True
+            self._send_error_response(message=str(e), status_code=e.status_code)
+        except UpstreamRejected as e:
+            timed_print(f'Upstream request rejected ({e.status_code}): {e}')
+            self._send_error_response(message=str(e), status_code=e.status_code, retry_after=e.retry_after)
+        except requests.RequestException as e:
+            timed_print(f'Acunetix request failed: {e}')
+            self._send_error_response(message=f'Acunetix service is unavailable: {e}', status_code=503,
+                                      retry_after=api.circuit_breaker.retry_after)
+        except NotFoundError as e:
+            self._send_error_response(message=str(e), status_code=404)
+        except AcunetixAPIError as e:
+            timed_print(f'Acunetix API error: {e}')
+            self._send_error_response(message=str(e), status_code=502)
+
+    return wrapper
+
+
+def traced_request(func):
+    """ Trace the request stages (and profile it when the profiler is enabled) """
+    def wrapper(self: "Client", *args, **kwargs):
+        name = f'{self.command} {self.path.split("?")[0]}'
+        with trace_request(name=name, request_id=self.headers.get('X-Request-ID')), request_profiler.profile():
+            return func(self, *args, **kwargs)
+
+    return wrapper
+
+
 # noinspection PyPep8Naming
 class Client(server.BaseHTTPRequestHandler):
     """
     Socket Client base functions and logic
     """
-    def _init_request_data(self) -> (str, dict | list, Any):
-        parsed_path = urlparse(self.path)
-        query_params = parse_qs(parsed_path.query)
-        watcher = None
-        if client_uuid := query_params.get('watcher_uuid', None):
-            watcher = targets_queue.get_watcher(client_uuid=str(client_uuid))
-            watcher.update_last_request_time()
-            del query_params['watcher_uuid']
-
-        # Reconstruct the modified path
-        modified_query = urlencode(query_params, doseq=True)
-        self.path = urlunparse(parsed_path._replace(query=modified_query))
-        return self.path.removeprefix('/api/v1/'), modified_query, watcher
-
-    def do_GET(self):
-        path, query_params, watcher = self._init_request_data()
-        response = api.get_request(path=path)
-        self._send_api_response(response=response)
+    def _init_request_data(self) -> ProxyRequest | None:
+        path, _, query = self.path.partition('?')
+        watcher, watcher_uuid = None, None
+        # the query string is parsed and rebuilt only when it carries the watcher
+        if 'watcher_uuid' in query:
+            query_params = parse_qs(query)
+            if client_uuid := query_params.pop('watcher_uuid', None):
+                watcher_uuid = client_uuid[0]
+                watcher = targets_queue.touch_watcher(client_uuid=watcher_uuid)
+            query = urlencode(query_params, doseq=True)
+            self.path = f'{path}?{query}' if query else path
+        route_path = path.removeprefix('/api/v1/')
+        route, params = ROUTES.match(method=self.command, route_path=route_path)
+        if not route:
+            return None
+        return ProxyRequest(
+            method=self.command,
+            path=f'{route_path}?{query}' if query else route_path,
+            route_path=route_path,
+            query=query,
+            watcher=watcher,
+            route=route,
+            params=params,
+            body=self._init_request_body() if self.command in ('POST', 'PATCH') else None,
+            watcher_uuid=watcher_uuid,
+        )
 
-    def do_POST(self):
-        path, query_params, watcher = self._init_request_data()
-        content_length = int(self.headers["Content-Length"])
-        post_data = self.rfile.read(content_length)
-
-        match path:
-            case 'me/login':
-                self._handle_log_in(post_data=json.loads(post_data))
-            case 'targets':
-                if not watcher:
-                    self.through_not_authorised()
-                else:
-                    self._handle_target_creating(path=path, post_data=post_data, watcher=watcher)
-            case 'scans':
-                new_scan_data = json.loads(post_data)
-                target_id = new_scan_data.get('target_id', None)
-                if not target_id:
-                    self.through_not_found_error()
-                if target_scan := next(filter(lambda scan: scan.target_id == target_id, api.get_scans()), None):
-                    response = api.get_request(f'scans/{target_scan.scan_id}')
-                else:
-                    response = api.post_request(path=path, data=post_data)
-                self._send_api_response(response=response)
-            case _:
-                response = api.post_request(path=path, data=post_data)
-                self._send_api_response(response=response)
-        
-
-    def do_PATCH(self):
-        path, query_params, watcher = self._init_request_data()
-        content_length = int(self.headers["Content-Length"])
-        post_data = self.rfile.read(content_length)
-        match path:
-            case 'me':
-                self._handle_log_in(post_data=json.loads(post_data))
-            case _:
-                response = api.patch_request(path=path, data=post_data)
-                self._send_api_response(response=response)
+    def _init_request_body(self) -> RequestBody:
+        return RequestBody(rfile=self.rfile, headers=self.headers,
+                           tee=BodyTee(limit=traffic_recorder.body_limit) if traffic_recorder.is_active else None)
+
+    @traced_request
+    def _dispatch(self):
+        started = time.perf_counter()
+        self.response_status = None
+        request = self._init_request_data()
+        try:
+            self._route_request(request=request)
+        finally:
+            if traffic_recorder.is_active:
+                self._capture_request(request=request, elapsed_ms=(time.perf_counter() - started) * 1000)
 
-    def do_DELETE(self):
-        path, query_params, watcher = self._init_request_data()
-        match path:
-            case path if path.startswith('targets/'):
-                response = api.get_request(path=path)
-                if watcher:
-                    if targets_queue.delete_target(target=response.json(), watcher=watcher):
-                        response = api.delete_request(path=path)
-                        self._send_api_response(response=response)
-                    else:
-                        self._send_response(data_to_send=b'{"response": "Ok"}')
-                else:
-                    self._send_response(data_to_send=b'{"response": "Ok"}')
+    do_GET = do_POST = do_PATCH = do_DELETE = _dispatch
+
+    @handle_upstream_rejection
+    def _route_request(self, request: ProxyRequest | None):
+        if not request:
+            self._send_response(data_to_send=b'{"response": "Method is not supported"}', status_code=405)
+            return
+        if request.route.policy.requires_watcher and not request.watcher:
+            self.through_not_authorised()
+            return
+        with upstream_priority(request.route.policy.priority):
+            getattr(self, request.route.handler)(request)
+
+    def _capture_request(self, request: ProxyRequest | None, elapsed_ms: float):
+        if not request:
+            traffic_recorder.record_downstream(method=self.command, path=self.path.removeprefix('/api/v1/'),
+                                               watcher_uuid=None, body=None, status=self.response_status,
+                                               elapsed_ms=elapsed_ms)
+            return
+        tee = request.body.tee if request.body else None
+        body = bytes(tee.data) if tee else None
+        if request.route.handler == '_handle_log_in':
+            # credentials are not written to the trace, the replayer logs in with its own
+            tee = body = None
+        traffic_recorder.record_downstream(method=request.method, path=request.path,
+                                           watcher_uuid=request.watcher_uuid, body=body,
+                                           status=self.response_status, elapsed_ms=elapsed_ms,
+                                           body_size=tee.size if tee and tee.is_truncated else None)
+
+    def _handle_proxy(self, request: ProxyRequest):
+        """ Forward the request to Acunetix as is """
+        match request.method:
+            case 'GET':
+                response = api.get_request(path=request.path)
+            case 'DELETE':
+                response = api.delete_request(path=request.path)
+            case _ if request.route.policy.streaming:
+                self._forward_streamed_body(path=request.path, body=request.body)
+                return
+            case 'POST':
+                response = api.post_request(path=request.path, data=request.data)
             case _:
+                response = api.patch_request(path=request.path, data=request.data)
+        self._send_api_response(response=response)
+
+    def _handle_target_deleting(self, request: ProxyRequest):
+        path, watcher = request.path, request.watcher
+        response = api.get_request(path=path)
+        if response.status_code == 404:
+            results_cache.forget_target(target_id=request.params['target_id'])
+            self._send_api_response(response=response)
+        elif watcher:
+            with span('targets_queue.delete_target'):
+                is_target_removed = targets_queue.delete_target(target=response.json(), watcher=watcher)
+            if is_target_removed:
                 response = api.delete_request(path=path)
+                if response.status_code in (204, 404):
+                    results_cache.forget_target(target_id=request.params['target_id'])
                 self._send_api_response(response=response)
+            else:
+                self._send_response(data_to_send=b'{"response": "Ok"}')
+        else:
+            self._send_response(data_to_send=b'{"response": "Ok"}')
+
+    def _forward_streamed_body(self, path: str, body: RequestBody):
+        """ Pipe the request body to Acunetix without buffering it """
+        with span('upstream streamed body'):
+            response = api.stream_body_request(method=self.command, path=path, data=body.stream())
+        self._send_api_response(response=response)
+
+    def send_response(self, code: int, message: str = None):
+        self.response_status = code
+        super().send_response(code, message)
+        if request_id := current_request_id():
+            self.send_header('X-Request-ID', request_id)
 
+    def log_message(self, format: str, *args):
+        """ Access log through the non-blocking logger instead of writing to stderr """
+        logger.info(format % args, extra={'route': self.command})
 
     def through_not_found_error(self):
-        self.send_response(404)
+        self._send_response(data_to_send=b'{"response": "Not found"}', status_code=404)
 
     def through_not_authorised(self):
-        self.send_response(401)
+        self._send_response(data_to_send=b'{"response": "Unauthorized"}', status_code=401)
 
-    def _handle_log_in(self, post_data: dict):
+    def _handle_log_in(self, request: ProxyRequest):
+        post_data = request.json()
         if post_data.get('email') != CLI_ARGUMENTS.username or post_data.get('password') != api.hash_password:
             self.through_not_authorised()
         else:
@@ -118,29 +245,235 @@ class Client(server.BaseHTTPRequestHandler):
             }
             self._send_response(data_to_send=json.dumps(response).encode())
 
-    def _handle_target_creating(self, path: str, post_data: bytes, watcher):
-        client_target = targets_queue.check_target(target=json.loads(post_data), watcher=watcher)
-        if not client_target.target_id:
+    def _handle_events_subscription(self, request: ProxyRequest):
+        """ Fake SSE endpoint: hand the connection over to the scan events hub """
+        query_params, watcher = parse_qs(request.query), request.watcher
+        last_event_id = self.headers.get('Last-Event-ID') or next(iter(query_params.get('last_event_id', [])), None)
+        try:
+            last_event_id = int(last_event_id) if last_event_id is not None else None
+        except ValueError:
+            last_event_id = None
+        self.send_response(200)
+        for header in {'Content-type': 'text/event-stream; charset=utf8', 'Cache-Control': 'no-cache',
+                       'Connection': 'keep-alive', 'X-Accel-Buffering': 'no'}.items():
+            self.send_header(header[0], header[1])
+        self.end_headers()
+        self.wfile.flush()
+        self.close_connection = True
+        self.server.detach_request(self.request)
+        scan_events.subscribe(sock=self.request, watcher_uuid=watcher.uuid, last_event_id=last_event_id)
+
+    def _handle_vulnerabilities_query(self, request: ProxyRequest):
+        """ Fake endpoint: vulnerabilities served from the local index, synchronized incrementally on request """
+        params = {key: values[0] for key, values in parse_qs(request.query).items()}
+        try:
+            min_severity = int(params['min_severity']) if 'min_severity' in params else None
+            limit, offset = int(params.get('limit', 100)), int(params.get('offset', 0))
+        except ValueError:
+            self._send_response(data_to_send=b'{"response": "invalid numeric parameter"}', status_code=400)
+            return
+        if scan_id := params.get('scan_id'):
+            api.sync_scan_vulnerabilities(scan=api.get_scan(scan_id=scan_id), store=vulnerability_store)
+        vulnerabilities = vulnerability_store.query(scan_id=scan_id,
+                                                    target_id=params.get('target_id'),
+                                                    min_severity=min_severity,
+                                                    vt_id=params.get('vt_id'),
+                                                    vuln_id=params.get('vuln_id'),
+                                                    limit=limit,
+                                                    offset=offset)
+        response = {'vulnerabilities': [vulnerability.to_dict() for vulnerability in vulnerabilities]}
+        self._send_response(data_to_send=json.dumps(response).encode())
+
+    def _handle_profiling(self, request: ProxyRequest):
+        """ Fake admin endpoint: profile the next N requests and/or the requests during a time window.
+        It is available only with --profiling-endpoint """
+        if not CLI_ARGUMENTS.profiling_endpoint:
+            self.through_not_found_error()
+            return
+        post_data = request.json()
+        try:
+            requests_amount, seconds = int(post_data.get('requests', 0)), float(post_data.get('seconds', 0))
+        except (TypeError, ValueError):
+            requests_amount, seconds = 0, 0
+        if requests_amount <= 0 and seconds <= 0:
+            self._send_response(data_to_send=b'{"response": "requests or seconds must be positive"}', status_code=400)
+            return
+        request_profiler.enable(requests=requests_amount, seconds=seconds)
+        response = {'response': 'Ok', 'requests': requests_amount, 'seconds': seconds,
+                    'output_dir': request_profiler.output_dir}
+        self._send_response(data_to_send=json.dumps(response).encode())
+
+    def _handle_batch(self, request: ProxyRequest):
+        """ Fake batch endpoint: run several GET requests upstream and return all results at once """
+        post_data = request.json()
+        paths = post_data.get('paths')
+        if not isinstance(paths, list) or not all(isinstance(path, str) for path in paths):
+            self._send_response(data_to_send=b'{"response": "paths must be a list of strings"}', status_code=400)
+            return
+        if len(paths) > BATCH_MAX_PATHS:
+            response = {'response': f'paths must contain at most {BATCH_MAX_PATHS} items'}
+            self._send_response(data_to_send=json.dumps(response).encode(), status_code=400)
+            return
+        unique_paths = list(dict.fromkeys(path.removeprefix('/api/v1/') for path in paths))
+        futures = [batch_executor.submit(contextvars.copy_context().run, self._batch_get, path) for path in unique_paths]
+        responses = dict(zip(unique_paths, (future.result() for future in futures)))
+        result = {
+            'responses': [
+                {'path': path, **responses[path.removeprefix('/api/v1/')]}
+                for path in paths
+            ]
+        }
+        self._send_response(data_to_send=json.dumps(result).encode())
+
+    @staticmethod
+    def _batch_get(path: str) -> dict:
+        try:
+            response = api.get_request(path=path)
+        except UpstreamRejected as e:
+            return {'status_code': e.status_code, 'body': {'response': str(e)}, 'retry_after': e.retry_after}
+        except requests.RequestException as e:
+            return {'status_code': 503, 'body': {'response': f'Acunetix service is unavailable: {e}'},
+                    'retry_after': api.circuit_breaker.retry_after}
+        try:
+            body = response.json()
+        except ValueError:
+            body = response.text
+        return {'status_code': response.status_code, 'body': body}
+
+    def _handle_scan_reading(self, request: ProxyRequest):
+        path, scan_id = request.path, request.params['scan_id']
+        if cached_result := results_cache.find_by_scan(scan_id=scan_id):
+            self._send_response(data_to_send=json.dumps(cached_result.scan).encode())
+            return
+        response = api.get_request(path=path)
+        if response.status_code == 200:
+            self._store_completed_scan(scan=response.json())
+        self._send_api_response(response=response)
+
+    def _handle_scan_deleting(self, request: ProxyRequest):
+        response = api.delete_request(path=request.path)
+        if response.status_code in (204, 404):
+            results_cache.forget_scan(scan_id=request.params['scan_id'])
+        self._send_api_response(response=response)
+
+    @staticmethod
+    def _store_completed_scan(scan: dict):
+        """ Cache a completed scan, its freshness is counted from the end of the scan session """
+        session = scan.get('current_session') or {}
+        if (results_cache.freshness_seconds <= 0 or session.get('status') != AcunetixScanStatuses.COMPLETED.value
+                or results_cache.is_known_scan(scan_id=scan['scan_id'])):
+            return
+        # the start of the session is the earliest bound when its end is unknown
+        completed_at = (api.get_scan_end_time(scan_id=scan['scan_id'], result_id=session.get('scan_session_id'))
+                        or api.parse_date(session.get('start_date')))
+        if completed_at is not None:
+            results_cache.store_scan(scan=scan, completed_at=completed_at)
+
+    def _handle_report_reading(self, request: ProxyRequest):
+        path, report_id = request.path, request.params['report_id']
+        if cached_report := results_cache.find_report(report_id=report_id):
+            self._send_response(data_to_send=json.dumps(cached_report).encode())
+            return
+        response = api.get_request(path=path)
+        if response.status_code == 200:
+            results_cache.store_report(report=response.json())
+        self._send_api_response(response=response)
+
+    def _handle_scan_creating(self, request: ProxyRequest):
+        path, post_data = request.path, request.data
+        new_scan_data = request.json()
+        target_id = new_scan_data.get('target_id', None)
+        if not target_id:
+            self.through_not_found_error()
+            return
+        profile_id = new_scan_data.get('profile_id') or constants.DEFAULT_PROFILE_ID
+        cached_result = results_cache.find_by_target(target_id=target_id, profile_id=profile_id)
+        if cached_result and self._check_cached_target(target_id=target_id):
+            timed_print(f'Reusing completed scan {cached_result.scan_id} for the target {target_id}')
+            self._send_response(data_to_send=json.dumps(cached_result.scan).encode())
+            return
+        if target_scan := next(filter(lambda scan: scan.target_id == target_id and scan.profile_id == profile_id,
+                                      api.get_scans()), None):
+            response = api.get_request(f'scans/{target_scan.scan_id}')
+        else:
             response = api.post_request(path=path, data=post_data)
-            if response.status_code == 409:
-                timed_print('Problems with license. Can not add second target. Check if existed target can be removed')
+        self._send_api_response(response=response)
+
+    def _handle_report_creating(self, request: ProxyRequest):
+        path, post_data = request.path, request.data
+        report_data = request.json()
+        scan_ids = (report_data.get('source') or {}).get('id_list') or []
+        if len(scan_ids) == 1 and (cached_report := results_cache.find_scan_report(
+                scan_id=scan_ids[0], template_id=report_data.get('template_id'))):
+            self._send_response(data_to_send=json.dumps(cached_report).encode(), status_code=201)
+            return
+        response = api.post_request(path=path, data=post_data)
+        self._send_api_response(response=response)
+
+    def _handle_target_creating(self, request: ProxyRequest):
+        path, post_data, watcher = request.path, request.data, request.watcher
+        target_data = request.json()
+        if target_id := self._find_cached_target(address=target_data.get('address', '')):
+            timed_print(f'Reusing the scanned target {target_id} for the address {target_data.get("address")}')
+            # the watcher keeps the reused target alive until it deletes the target itself
+            with span('targets_queue.check_target'):
+                client_target = targets_queue.check_target(target=target_data, watcher=watcher)
+            if not client_target.target_id:
+                targets_queue.set_target_id(address=client_target.address, target_id=target_id)
+            response = {'order': 0, 'target_id': target_id}
+            self._send_response(data_to_send=json.dumps(response).encode())
+            return
+        with span('targets_queue.check_target'):
+            client_target = targets_queue.check_target(target=target_data, watcher=watcher)
+        if not client_target.target_id:
+            with span('targets_queue.begin_target_creating'):
+                token = targets_queue.begin_target_creating(address=client_target.address)
+            if token:
+                try:
+                    self._create_queue_target(client_target=client_target, path=path, post_data=post_data)
+                finally:
+                    targets_queue.finish_target_creating(address=client_target.address, token=token)
+                return
+            # another request has created the target while this one was waiting
+            client_target = targets_queue.get_target(address=client_target.address) or client_target
+        response = {'order': client_target.order, 'target_id': client_target.target_id}
+        self._send_response(data_to_send=json.dumps(response).encode())
+
+    def _create_queue_target(self, client_target: ClientTarget, path: str, post_data: bytes):
+        response = api.post_request(path=path, data=post_data)
+        if response.status_code == 409:
+            timed_print('Problems with license. Can not add second target. Check if existed target can be removed')
+            with span('check_if_current_target_can_be_removed'):
                 api_target, is_allowed_to_remove = self._check_if_current_target_can_be_removed()
-                if api_target.address == client_target.address:
-                    timed_print('Trying to add same target. continue scan')
-                    client_target.target_id = api_target.target_id
-                    response = {'order': client_target.order, 'target_id': client_target.target_id}
-                else:
-                    timed_print(f'Allowance for removing data: {is_allowed_to_remove}')
-                    if is_allowed_to_remove:
-                        api.delete_target(target=api_target)
-                    response = {'order': client_target.order}
-                self._send_response(data_to_send=json.dumps(response).encode())
+            if api_target and normalize_address(api_target.address) == client_target.key:
+                timed_print('Trying to add same target. continue scan')
+                client_target.target_id = api_target.target_id
+                targets_queue.set_target_id(address=client_target.address, target_id=client_target.target_id)
+                response = {'order': client_target.order, 'target_id': client_target.target_id}
             else:
-                client_target.target_id = response.json().get('target_id')
-                self._send_api_response(response=response)
-        else:
-            response = {'order': client_target.order, 'target_id': client_target.target_id}
+                timed_print(f'Allowance for removing data: {is_allowed_to_remove}')
+                if is_allowed_to_remove:
+                    api.delete_target(target=api_target)
+                    results_cache.forget_target(target_id=api_target.target_id)
+                response = {'order': client_target.order}
             self._send_response(data_to_send=json.dumps(response).encode())
+        else:
+            client_target.target_id = response.json().get('target_id')
+            targets_queue.set_target_id(address=client_target.address, target_id=client_target.target_id)
+            self._send_api_response(response=response)
+
+    def _find_cached_target(self, address: str) -> str | None:
+        """ Target of a cached scan result for the address if it still exists upstream """
+        target_id = results_cache.find_target_id(address=address)
+        return target_id if target_id and self._check_cached_target(target_id=target_id) else None
+
+    @staticmethod
+    def _check_cached_target(target_id: str) -> bool:
+        """ Cached results are used only while their target exists upstream """
+        status_code = api.get_request(f'targets/{target_id}').status_code
+        if status_code == 404:
+            results_cache.forget_target(target_id=target_id)
+        return status_code == 200
 
     def _fill_default_headers(self):
         headers = {'Content-type': 'application/json; charset=utf8', 'Pragma': 'no-cache', 'Expires': '-1',
@@ -156,7 +489,15 @@ class Client(server.BaseHTTPRequestHandler):
             if header[0].lower() != "transfer-encoding":
                 self.send_header(header[0], header[1])
         self.end_headers()
-        self.wfile.write(response.content)
+        with span('send_response'):
+            self.wfile.write(response.content)
+
+    def _send_error_response(self, message: str, status_code: int, retry_after: int = None):
+        self.send_response(status_code)
+        if retry_after:
+            self.send_header('Retry-After', str(retry_after))
+        self._fill_default_headers()
+        self.wfile.write(json.dumps({'response': message}).encode())
 
     def _send_response(self, data_to_send: bytes | None, status_code: int = 200, ):
         """ Send direct response """
@@ -171,13 +512,6 @@ class Client(server.BaseHTTPRequestHandler):
         api_targets = api.get_targets()
         if len(api_targets) < 1:
             return None, False
-        is_allowed_to_remove = True
         target = api_targets[0]
-        client_targets = list(filter(lambda item: item.address == target.address, targets_queue.targets))
-        for _client_target in client_targets:
-            for watcher in _client_target.watchers:
-                if watcher.is_no_requests:
-                    _client_target.remove_watcher(watcher=watcher)
-            if _client_target.watchers_amount > 0:
-                is_allowed_to_remove = False
+        is_allowed_to_remove = targets_queue.release_idle_watchers(address=target.address)
         return target, is_allowed_to_remove
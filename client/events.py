@@ -0,0 +1,224 @@
+import json
+import selectors
+import socket
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+from core.tools import timed_print
+
+if TYPE_CHECKING:
+    from api.base import AcunetixAPI
+    from scanner.scanner_base import TargetsQueue
+
+
+@dataclass
+class EventSubscriber:
+    sock: socket.socket
+    watcher_uuid: str
+    pending: bytearray = field(default_factory=bytearray)
+    last_write_time: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class WatcherChannel:
+    watcher_uuid: str
+    history: deque
+    last_event_id: int = 0
+    last_snapshot: str = None
+    last_seen_time: float = field(default_factory=time.monotonic)
+
+
+class ScanEventsHub:
+    """
+    Server-Sent Events channel for scan progress.
+    All subscribers are served by one background thread: sockets are non-blocking and multiplexed with a selector,
+    upstream scans are polled once per tick for every subscribed watcher and events are pushed only on changes.
+    """
+    MAX_PENDING_BYTES = 256 * 1024
+    CHANNEL_TTL = 600
+
+    def __init__(self,
+                 api: "AcunetixAPI",
+                 targets_queue: "TargetsQueue",
+                 poll_interval: float = 5.0,
+                 heartbeat_interval: float = 15.0,
+                 history_size: int = 100):
+        self.api = api
+        self.targets_queue = targets_queue
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.history_size = history_size
+        self.subscribers: dict[socket.socket, EventSubscriber] = {}
+        self.channels: dict[str, WatcherChannel] = {}
+        self._new_subscribers: deque[tuple[EventSubscriber, int | None]] = deque()
+        self._selector = selectors.DefaultSelector()
+        self._wakeup_reader, self._wakeup_writer = socket.socketpair()
+        self._wakeup_reader.setblocking(False)
+        self._selector.register(self._wakeup_reader, selectors.EVENT_READ)
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def subscribe(self, sock: socket.socket, watcher_uuid: str, last_event_id: int | None = None):
+        """ Take ownership of an already answered (headers sent) client socket """
+        sock.setblocking(False)
+        with self._lock:
+            self._new_subscribers.append((EventSubscriber(sock=sock, watcher_uuid=watcher_uuid), last_event_id))
+            if not self._thread:
+                self._thread = threading.Thread(target=self._run, name='scan-events', daemon=True)
+                self._thread.start()
+        self._wakeup_writer.send(b'\0')
+
+    def _run(self):
+        next_poll_time = time.monotonic()
+        while True:
+            timeout = max(0.0, next_poll_time - time.monotonic())
+            for key, mask in self._selector.select(timeout=timeout):
+                if key.fileobj is self._wakeup_reader:
+                    self._drain_wakeup()
+                    continue
+                subscriber = key.data
+                if mask & selectors.EVENT_READ and not self._is_alive(subscriber):
+                    self._drop(subscriber)
+                    continue
+                if mask & selectors.EVENT_WRITE:
+                    self._flush(subscriber)
+            self._accept_new_subscribers()
+            now = time.monotonic()
+            if now >= next_poll_time:
+                try:
+                    self._poll()
+                except Exception as e:
+                    timed_print(f'Scan events polling failed: {e}')
+                self._send_heartbeats(now=now)
+                self._expire_channels(now=now)
+                next_poll_time = now + self.poll_interval
+
+    def _drain_wakeup(self):
+        try:
+            while self._wakeup_reader.recv(4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def _accept_new_subscribers(self):
+        with self._lock:
+            new_subscribers, self._new_subscribers = self._new_subscribers, deque()
+        for subscriber, last_event_id in new_subscribers:
+            self.subscribers[subscriber.sock] = subscriber
+            self._selector.register(subscriber.sock, selectors.EVENT_READ, data=subscriber)
+            channel = self._get_channel(watcher_uuid=subscriber.watcher_uuid)
+            self._replay(subscriber=subscriber, channel=channel, last_event_id=last_event_id)
+
+    def _get_channel(self, watcher_uuid: str) -> WatcherChannel:
+        channel = self.channels.get(watcher_uuid)
+        if not channel:
+            channel = WatcherChannel(watcher_uuid=watcher_uuid, history=deque(maxlen=self.history_size))
+            self.channels[watcher_uuid] = channel
+        return channel
+
+    def _replay(self, subscriber: EventSubscriber, channel: WatcherChannel, last_event_id: int | None):
+        """ Resume from the last received event or start from the latest known state """
+        if not channel.history:
+            return
+        oldest_event_id = channel.history[0][0]
+        if last_event_id is None or last_event_id < oldest_event_id - 1:
+            events = [channel.history[-1]]
+        else:
+            events = [event for event in channel.history if event[0] > last_event_id]
+        for _, payload in events:
+            self._queue(subscriber=subscriber, data=payload)
+
+    def _poll(self):
+        watcher_uuids = {subscriber.watcher_uuid for subscriber in self.subscribers.values()}
+        if not watcher_uuids:
+            return
+        scans = {scan.target_id: scan for scan in self.api.get_scans()}
+        for watcher_uuid in watcher_uuids:
+            channel = self._get_channel(watcher_uuid=watcher_uuid)
+            channel.last_seen_time = time.monotonic()
+            snapshot = json.dumps(self._build_snapshot(watcher_uuid=watcher_uuid, scans=scans), sort_keys=True)
+            if snapshot == channel.last_snapshot:
+                continue
+            channel.last_snapshot = snapshot
+            channel.last_event_id += 1
+            payload = f'id: {channel.last_event_id}\nevent: scan\ndata: {snapshot}\n\n'.encode()
+            channel.history.append((channel.last_event_id, payload))
+            for subscriber in list(self.subscribers.values()):
+                if subscriber.watcher_uuid == watcher_uuid:
+                    self._queue(subscriber=subscriber, data=payload)
+
+    def _build_snapshot(self, watcher_uuid: str, scans: dict) -> dict:
+        targets = []
+        for client_target in self.targets_queue.get_watcher_targets(client_uuid=watcher_uuid):
+            target_data = {
+                'address': client_target.address,
+                'target_id': client_target.target_id,
+                'order': client_target.order,
+            }
+            if scan := scans.get(client_target.target_id):
+                session = scan.current_session
+                target_data.update({
+                    'scan_id': scan.scan_id,
+                    'status': session.status,
+                    'progress': session.progress,
+                    'threat': session.threat,
+                    'severity_counts': session.severity_counts,
+                })
+            targets.append(target_data)
+        return {'targets': targets}
+
+    def _send_heartbeats(self, now: float):
+        for subscriber in list(self.subscribers.values()):
+            if not subscriber.pending and now - subscriber.last_write_time >= self.heartbeat_interval:
+                self._queue(subscriber=subscriber, data=b': heartbeat\n\n')
+
+    def _expire_channels(self, now: float):
+        active_watchers = {subscriber.watcher_uuid for subscriber in self.subscribers.values()}
+        for watcher_uuid, channel in list(self.channels.items()):
+            if watcher_uuid not in active_watchers and now - channel.last_seen_time > self.CHANNEL_TTL:
+                del self.channels[watcher_uuid]
+
+    def _queue(self, subscriber: EventSubscriber, data: bytes):
+        subscriber.pending += data
+        if len(subscriber.pending) > self.MAX_PENDING_BYTES:
+            timed_print(f'Dropping slow events subscriber for watcher {subscriber.watcher_uuid}')
+            self._drop(subscriber)
+            return
+        self._flush(subscriber)
+
+    def _flush(self, subscriber: EventSubscriber):
+        if subscriber.sock not in self.subscribers:
+            return
+        try:
+            sent = subscriber.sock.send(subscriber.pending)
+        except BlockingIOError:
+            sent = 0
+        except OSError:
+            self._drop(subscriber)
+            return
+        if sent:
+            del subscriber.pending[:sent]
+            subscriber.last_write_time = time.monotonic()
+        events = selectors.EVENT_READ | (selectors.EVENT_WRITE if subscriber.pending else 0)
+        self._selector.modify(subscriber.sock, events, data=subscriber)
+
+    @staticmethod
+    def _is_alive(subscriber: EventSubscriber) -> bool:
+        try:
+            return bool(subscriber.sock.recv(4096))
+        except BlockingIOError:
+            return True
+        except OSError:
+            return False
+
+    def _drop(self, subscriber: EventSubscriber):
+        if self.subscribers.pop(subscriber.sock, None) is None:
+            return
+        self._selector.unregister(subscriber.sock)
+        try:
+            subscriber.sock.close()
+        except OSError:
+            pass
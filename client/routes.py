@@ -0,0 +1,133 @@
+import json
+import re
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
+
+from api.admission import RequestPriority
+from client.body import RequestBodyError
+
+if TYPE_CHECKING:
+    from client.body import RequestBody
+    from scanner.scanner_base import ClientWatcher
+
+PARAMETER = re.compile(r'{(\w+)}')
+
+
+@dataclass(frozen=True)
+class RoutePolicy:
+    """
+    Per-route handling options:
+        cacheable: responses can be served from a local cache.
+        coalescable: identical concurrent requests can share one upstream call.
+        streaming: the request body is streamed upstream instead of being buffered.
+        requires_watcher: the request must carry a `watcher_uuid`.
+        priority: upstream admission priority (`None` - classified by the request path).
+    """
+    cacheable: bool = False
+    coalescable: bool = False
+    streaming: bool = False
+    requires_watcher: bool = False
+    priority: RequestPriority | None = None
+
+
+@dataclass
+class Route:
+    method: str
+    pattern: str
+    handler: str
+    policy: RoutePolicy = field(default_factory=RoutePolicy)
+    regex: re.Pattern = field(init=False, repr=False)
+
+    def __post_init__(self):
+        parts = PARAMETER.split(self.pattern)
+        self.regex = re.compile(''.join(
+            re.escape(part) if index % 2 == 0 else f'(?P<{part}>[^/]+)' for index, part in enumerate(parts)
+        ))
+
+    @property
+    def is_static(self) -> bool:
+        return not PARAMETER.search(self.pattern)
+
+
+@dataclass
+class ProxyRequest:
+    """ Parsed downstream request passed to the route handlers """
+    method: str
+    path: str
+    route_path: str
+    query: str
+    watcher: "ClientWatcher | None"
+    route: Route
+    params: dict[str, str]
+    body: "RequestBody | None" = None
+    watcher_uuid: str | None = None
+    _data: bytes | None = field(default=None, repr=False)
+
+    @property
+    def data(self) -> bytes:
+        """ Buffered request body (read once) """
+        if self._data is None:
+            self._data = self.body.read() if self.body else b''
+        return self._data
+
+    def json(self) -> dict[str, Any]:
+        """ Body as a JSON object, `RequestBodyError` (400) if it is anything else """
+        try:
+            data = json.loads(self.data) if self.data else {}
+        except ValueError as e:
+            raise RequestBodyError(f'Request body is not valid JSON: {e}')
+        if not isinstance(data, dict):
+            raise RequestBodyError('Request body must be a JSON object')
+        return data
+
+
+class RouteTable:
+    """
+    Route registry: patterns are compiled once, static routes are looked up in a dict,
+    parametrized routes are matched in registration order, the default route of the method is used otherwise.
+    """
+
+    def __init__(self):
+        self._static: dict[tuple[str, str], Route] = {}
+        self._dynamic: dict[str, list[Route]] = {}
+        self._default: dict[str, Route] = {}
+
+    def add(self, method: str, pattern: str, handler: str, **policy) -> Route:
+        route = Route(method=method, pattern=pattern, handler=handler, policy=RoutePolicy(**policy))
+        if pattern == '*':
+            self._default[method] = route
+        elif route.is_static:
+            self._static[(method, pattern)] = route
+        else:
+            self._dynamic.setdefault(method, []).append(route)
+        return route
+
+    def match(self, method: str, route_path: str) -> tuple[Route | None, dict[str, str]]:
+        if route := self._static.get((method, route_path)):
+            return route, {}
+        for route in self._dynamic.get(method, []):
+            if match := route.regex.fullmatch(route_path):
+                return route, match.groupdict()
+        return self._default.get(method), {}
+
+
+ROUTES = RouteTable()
+ROUTES.add('GET', 'fake/events', '_handle_events_subscription', requires_watcher=True)
+ROUTES.add('GET', 'fake/vulnerabilities', '_handle_vulnerabilities_query')
+ROUTES.add('GET', 'scans/{scan_id}', '_handle_scan_reading',
+           cacheable=True, coalescable=True, priority=RequestPriority.HIGH)
+ROUTES.add('GET', 'reports/{report_id}', '_handle_report_reading', cacheable=True, coalescable=True)
+ROUTES.add('GET', 'reports/download/{descriptor}', '_handle_proxy', coalescable=True, priority=RequestPriority.LOW)
+ROUTES.add('GET', '*', '_handle_proxy', coalescable=True)
+ROUTES.add('POST', 'me/login', '_handle_log_in', priority=RequestPriority.HIGH)
+ROUTES.add('POST', 'fake/batch', '_handle_batch')
+ROUTES.add('POST', 'fake/profile', '_handle_profiling', requires_watcher=True)
+ROUTES.add('POST', 'targets', '_handle_target_creating', requires_watcher=True)
+ROUTES.add('POST', 'scans', '_handle_scan_creating')
+ROUTES.add('POST', 'reports', '_handle_report_creating')
+ROUTES.add('POST', '*', '_handle_proxy', streaming=True)
+ROUTES.add('PATCH', 'me', '_handle_log_in', priority=RequestPriority.HIGH)
+ROUTES.add('PATCH', '*', '_handle_proxy', streaming=True)
+ROUTES.add('DELETE', 'targets/{target_id}', '_handle_target_deleting')
+ROUTES.add('DELETE', 'scans/{scan_id}', '_handle_scan_deleting')
+ROUTES.add('DELETE', '*', '_handle_proxy')
@@ -0,0 +1,260 @@
+import hashlib
+import json
+import math
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+import requests
+
+from api.admission import route_key
+from core.standin import AcunetixStandIn
+from core.tools import timed_print, decode_body
+
+LOGIN_ROUTES = (('POST', 'me/login'), ('PATCH', 'me'))
+SKIPPED_ROUTES = (('GET', 'fake/events'),)
+
+
+def percentile(values: list[float], percent: float) -> float:
+    """ Nearest-rank percentile """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(percent / 100 * len(ordered)) - 1)]
+
+
+def latency_summary(values: list[float]) -> dict:
+    return {
+        'count': len(values),
+        'p50': round(percentile(values, 50), 1),
+        'p90': round(percentile(values, 90), 1),
+        'p99': round(percentile(values, 99), 1),
+        'max': round(max(values, default=0.0), 1),
+    }
+
+
+@dataclass
+class ReplayReport:
+    duration: float = 0.0
+    requests: int = 0
+    skipped: int = 0
+    errors: int = 0
+    latencies_ms: dict[str, list[float]] = field(default_factory=lambda: defaultdict(list))
+    status_mismatches: Counter = field(default_factory=Counter)
+    upstream_calls: int = 0
+    recorded_upstream_calls: int = 0
+    recorded_requests: int = 0
+    missing_upstream_responses: Counter = field(default_factory=Counter)
+    target_orders: Counter = field(default_factory=Counter)
+    target_conflicts: int = 0
+    targets_queued: int = 0
+
+    @staticmethod
+    def _amplification(upstream_calls: int, requests_amount: int) -> float:
+        return round(upstream_calls / requests_amount, 2) if requests_amount else 0.0
+
+    def to_dict(self) -> dict:
+        all_latencies = [value for values in self.latencies_ms.values() for value in values]
+        return {
+            'duration': round(self.duration, 2),
+            'requests': self.requests,
+            'skipped': self.skipped,
+            'errors': self.errors,
+            'latency_ms': latency_summary(all_latencies),
+            'routes': {route: latency_summary(values) for route, values in sorted(self.latencies_ms.items())},
+            'status_mismatches': {f'{route}: {recorded} -> {replayed}': amount
+                                  for (route, recorded, replayed), amount in self.status_mismatches.items()},
+            'upstream': {
+                'calls': self.upstream_calls,
+                'amplification': self._amplification(self.upstream_calls, self.requests),
+                'recorded_amplification': self._amplification(self.recorded_upstream_calls,
+                                                              self.recorded_requests),
+                'missing_responses': dict(self.missing_upstream_responses),
+            },
+            'targets_queue': {
+                'orders': {str(order): amount for order, amount in sorted(self.target_orders.items())},
+                'queued': self.targets_queued,
+                'license_conflicts': self.target_conflicts,
+            },
+        }
+
+
+def format_report(report: dict, baseline: dict | None = None) -> list[str]:
+    """ Human readable summary, the main figures are compared with the baseline report when it is given """
+    def compare(value: float, baseline_value: float | None) -> str:
+        if baseline_value is None:
+            return f'{value}'
+        change = (value - baseline_value) / baseline_value * 100 if baseline_value else 0.0
+        return f'{value} (baseline {baseline_value}, {change:+.1f}%)'
+
+    def baseline_value(*keys: str) -> float | None:
+        value = baseline
+        for key in keys:
+            if not isinstance(value, dict):
+                return None
+            value = value.get(key)
+        return value
+
+    latency = report['latency_ms']
+    lines = [
+        f'Requests: {report["requests"]} (skipped {report["skipped"]}, errors {report["errors"]}) '
+        f'in {report["duration"]}s',
+        'Latency ms: ' + ', '.join(f'{name} {compare(latency[name], baseline_value("latency_ms", name))}'
+                                   for name in ('p50', 'p90', 'p99', 'max')),
+        f'Upstream calls: {report["upstream"]["calls"]}, amplification '
+        f'{compare(report["upstream"]["amplification"], baseline_value("upstream", "amplification"))} '
+        f'(recorded {report["upstream"]["recorded_amplification"]})',
+        f'Targets queue: orders {report["targets_queue"]["orders"]}, queued {report["targets_queue"]["queued"]}, '
+        f'license conflicts {report["targets_queue"]["license_conflicts"]}',
+    ]
+    if report['status_mismatches']:
+        lines.append(f'Status mismatches: {report["status_mismatches"]}')
+    if missing := report['upstream']['missing_responses']:
+        lines.append(f'Upstream requests missing in the trace: {missing}')
+    return lines
+
+
+class TraceReplayer:
+    """
+    Replays the downstream requests of a trace against the proxy.
+    Requests of one watcher are sent sequentially in their recorded order while watchers run concurrently,
+    `speed` scales the recorded schedule (2 - twice faster, 0 - without pauses). Every recorded watcher gets a new
+    uuid, so repeated replays against the same proxy do not share the queue state. Scan events subscriptions
+    are skipped, login requests are sent with the replayer credentials.
+    """
+
+    def __init__(self, proxy_url: str, records: list[dict], stand_in: AcunetixStandIn,
+                 username: str, password: str, speed: float = 1.0, timeout: float = 120):
+        self.proxy_url = proxy_url.rstrip('/')
+        self.stand_in = stand_in
+        self.speed = speed
+        self.timeout = timeout
+        self.login_data = json.dumps({'email': username, 'password': hashlib.sha256(password.encode()).hexdigest()})
+        self.downstream = sorted((record for record in records if record['type'] == 'downstream'),
+                                 key=lambda record: record['ts'])
+        request_ids = {record['request_id'] for record in self.downstream} - {None}
+        self.report = ReplayReport(
+            recorded_requests=len(self.downstream),
+            recorded_upstream_calls=sum(1 for record in records
+                                        if record['type'] == 'upstream' and record['request_id'] in request_ids),
+        )
+        self.watchers = {record['watcher']: str(uuid.uuid4()) for record in self.downstream if record['watcher']}
+        self._lock = threading.Lock()
+
+    def run(self) -> ReplayReport:
+        lanes: dict[str | None, list[dict]] = defaultdict(list)
+        for record in self.downstream:
+            lanes[record['watcher']].append(record)
+        first_ts = self.downstream[0]['ts'] if self.downstream else 0.0
+        self.stand_in.reset_counters()
+        started = time.monotonic()
+        threads = [threading.Thread(target=self._run_lane, args=(lane, started, first_ts), daemon=True)
+                   for lane in lanes.values()]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.report.duration = time.monotonic() - started
+        self.report.upstream_calls = self.stand_in.requests_count
+        self.report.missing_upstream_responses = self.stand_in.missing.copy()
+        return self.report
+
+    def _run_lane(self, records: list[dict], started: float, first_ts: float):
+        session = requests.Session()
+        session.trust_env = False
+        for record in records:
+            if (record['method'], record['path'].split('?')[0]) in SKIPPED_ROUTES:
+                with self._lock:
+                    self.report.skipped += 1
+                continue
+            if self.speed > 0:
+                delay = started + (record['ts'] - first_ts) / self.speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            self._send(session=session, record=record)
+        session.close()
+
+    def _send(self, session: requests.Session, record: dict):
+        method, path = record['method'], record['path']
+        route_path = path.split('?')[0]
+        data = self.login_data if (method, route_path) in LOGIN_ROUTES else decode_body(record) or None
+        if record.get('body_truncated'):
+            # only the prefix of the body is captured, the rest is padded to send the same amount of data
+            data = (data or b'').ljust(record['body_size'], b'\0')
+        url = f'{self.proxy_url}/api/v1/{path}'
+        if watcher := record['watcher']:
+            url += f'{"&" if "?" in path else "?"}watcher_uuid={self.watchers[watcher]}'
+        request_started = time.perf_counter()
+        try:
+            response = session.request(method, url, data=data, timeout=self.timeout)
+        except requests.RequestException as e:
+            timed_print(f'Replayed request {method} {path} failed: {e}')
+            with self._lock:
+                self.report.requests += 1
+                self.report.errors += 1
+            return
+        elapsed_ms = (time.perf_counter() - request_started) * 1000
+        route = f'{method} {route_key(route_path)}'
+        with self._lock:
+            self.report.requests += 1
+            self.report.latencies_ms[route].append(elapsed_ms)
+            if record['status'] is not None and record['status'] != response.status_code:
+                self.report.status_mismatches[(route, record['status'], response.status_code)] += 1
+            if (method, route_path) == ('POST', 'targets'):
+                self._count_target_creating(response=response)
+
+    def _count_target_creating(self, response: requests.Response):
+        if response.status_code == 409:
+            self.report.target_conflicts += 1
+            return
+        try:
+            body = response.json()
+        except ValueError:
+            return
+        if not isinstance(body, dict):
+            return
+        if 'order' in body:
+            self.report.target_orders[body['order']] += 1
+        if not body.get('target_id'):
+            self.report.targets_queued += 1
+
+
+def wait_for_port(host: str, port: int, timeout: float, process: subprocess.Popen = None) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process and process.poll() is not None:
+            return False
+        try:
+            with socket.create_connection((host, port), timeout=1):
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+@contextmanager
+def run_proxy(main_path: str, username: str, password: str, stand_in_port: int, listen_port: int,
+              extra_args: list[str], work_dir: str, startup_timeout: float = 60):
+    """ Start the proxy (main.py) against the stand-in and stop it with its workers on exit """
+    command = [sys.executable, main_path, '-u', username, '-p', password, '-ah', '127.0.0.1',
+               '-ap', str(stand_in_port), '--acunetix-scheme', 'http', '-sh', '127.0.0.1',
+               '-sp', str(listen_port), *extra_args]
+    process = subprocess.Popen(command, cwd=work_dir, start_new_session=True)
+    try:
+        if not wait_for_port(host='127.0.0.1', port=listen_port, timeout=startup_timeout, process=process):
+            raise RuntimeError(f'The proxy has not started on port {listen_port}')
+        yield process
+    finally:
+        os.killpg(process.pid, signal.SIGTERM)
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            os.killpg(process.pid, signal.SIGKILL)
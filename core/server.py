@@ -1,9 +1,70 @@
-from client.client_base import Client
-from core.tools import timed_print
+import multiprocessing
+import socket
 from http import server
 
+from core import state
+from core.tools import timed_print
+
+
+class ProxyHTTPServer(server.ThreadingHTTPServer):
+    """
+    HTTP server which handles every connection in its own thread, so concurrent clients compete for
+    the upstream admission slots. Handlers can keep a connection open after the request is handled
+    (used for streaming channels served outside of the request thread).
+    """
+
+    def __init__(self, *args, reuse_port: bool = False, **kwargs):
+        self.reuse_port = reuse_port
+        super().__init__(*args, **kwargs)
+        self._detached_requests = set()
+
+    def server_bind(self):
+        if self.reuse_port:
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        super().server_bind()
+
+    def detach_request(self, request):
+        self._detached_requests.add(request)
+
+    def shutdown_request(self, request):
+        if request in self._detached_requests:
+            self._detached_requests.discard(request)
+            return
+        super().shutdown_request(request)
+
+
+def _serve(listen_host: str, listen_port: int, reuse_port: bool = False):
+    # the client module connects to Acunetix on import, so it is imported in every worker process separately
+    from client.client_base import Client
+
+    http_server = ProxyHTTPServer((listen_host, listen_port), Client, reuse_port=reuse_port)
+    http_server.serve_forever()
+
 
 async def socket_listener(listen_host: str, listen_port: int):
     timed_print(f"Socket is listening on {listen_host}:{listen_port}")
-    http_server = server.HTTPServer((listen_host, listen_port), Client)
-    http_server.serve_forever()
+    _serve(listen_host=listen_host, listen_port=listen_port)
+
+
+def run_workers(listen_host: str, listen_port: int, workers: int, state_socket: str):
+    """
+    Run several server processes on the same port (SO_REUSEPORT) with the queue state and the Acunetix session
+    shared between them. The upstream admission control and the circuit breaker stay per process:
+    with N workers up to N × `--upstream-concurrency` requests reach Acunetix and every breaker trips on its own.
+    """
+    context = multiprocessing.get_context('fork')
+    manager = state.start_state_service(address=state_socket)
+    timed_print(f'Shared state service is listening on {state_socket}')
+    processes = [
+        context.Process(target=_serve, name=f'worker-{number}',
+                        kwargs={'listen_host': listen_host, 'listen_port': listen_port, 'reuse_port': True})
+        for number in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    timed_print(f"{workers} workers are listening on {listen_host}:{listen_port}")
+    try:
+        for process in processes:
+            process.join()
+    finally:
+        manager.shutdown()
@@ -0,0 +1,103 @@
+import threading
+import time
+from collections import Counter, defaultdict
+from http import server
+from typing import Iterable
+
+from client.body import RequestBody
+from core.tools import decode_body
+
+
+class AcunetixStandIn:
+    """
+    Local Acunetix replacement for trace replays: answers with the upstream responses recorded in the trace.
+    Responses of every (method, path) are served in their recorded order and the last one is repeated when
+    they run out; requests which were never recorded get 404. The recorded latency is reproduced multiplied
+    by `latency_scale` (0 - answer immediately). Logins are always accepted, they are not part of the trace.
+    """
+
+    def __init__(self, records: Iterable[dict], latency_scale: float = 1.0):
+        self.latency_scale = latency_scale
+        self.responses: dict[tuple[str, str], list[dict]] = defaultdict(list)
+        for record in records:
+            if record['type'] == 'upstream':
+                self.responses[(record['method'], record['path'])].append(record)
+        self.requests_count = 0
+        self.logins_count = 0
+        self.missing: Counter = Counter()
+        self._positions: Counter = Counter()
+        self._lock = threading.Lock()
+        self._server: server.ThreadingHTTPServer | None = None
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def start(self, host: str = '127.0.0.1', port: int = 0) -> int:
+        handler = type('StandInHandler', (StandInHandler,), {'stand_in': self})
+        self._server = server.ThreadingHTTPServer((host, port), handler)
+        threading.Thread(target=self._server.serve_forever, name='acunetix-stand-in', daemon=True).start()
+        return self.port
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def reset_counters(self):
+        """ Forget the calls made so far (the proxy startup) """
+        with self._lock:
+            self.requests_count = 0
+            self.logins_count = 0
+            self.missing.clear()
+
+    def count_login(self):
+        with self._lock:
+            self.logins_count += 1
+
+    def next_response(self, method: str, path: str) -> dict | None:
+        key = (method, path)
+        with self._lock:
+            self.requests_count += 1
+            responses = self.responses.get(key)
+            if not responses:
+                self.missing[f'{method} {path}'] += 1
+                return None
+            position = self._positions[key]
+            self._positions[key] = position + 1
+        return responses[min(position, len(responses) - 1)]
+
+
+# noinspection PyPep8Naming
+class StandInHandler(server.BaseHTTPRequestHandler):
+    stand_in: AcunetixStandIn
+    protocol_version = 'HTTP/1.1'
+
+    def _answer(self):
+        RequestBody(rfile=self.rfile, headers=self.headers).read()
+        path = self.path.removeprefix('/api/v1/')
+        if self.command == 'POST' and path == 'me/login':
+            self.stand_in.count_login()
+            self.send_response(204)
+            self.send_header('X-Auth', 'stand-in')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        record = self.stand_in.next_response(method=self.command, path=path)
+        if record is None:
+            status, content_type, body = 404, 'application/json', b'{"message": "Not recorded"}'
+        else:
+            if self.stand_in.latency_scale > 0:
+                time.sleep(record['elapsed_ms'] / 1000 * self.stand_in.latency_scale)
+            status, content_type, body = record['status'], record.get('content_type'), decode_body(record)
+        self.send_response(status)
+        if content_type:
+            self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = do_PATCH = do_DELETE = _answer
+
+    def log_message(self, format: str, *args):
+        pass
@@ -0,0 +1,109 @@
+import os
+import threading
+import uuid
+from multiprocessing.managers import BaseManager
+
+from api.exceptions import SessionLoginTimeout
+from scanner.scanner_base import TargetsQueue
+
+# Set by the parent process before the workers are forked. `None` means single process mode.
+STATE_SERVICE_ADDRESS: str | None = None
+
+
+class SessionStore:
+    """
+    Shared Acunetix session. Logging in with `logout_previous` invalidates the sessions of the other workers,
+    so only one worker logs in for every session version and the others adopt its headers and cookies.
+    """
+    LOGIN_TIMEOUT = 60
+
+    def __init__(self):
+        self.version = 0
+        self.headers: dict = {}
+        self.cookies: dict = {}
+        self._login_lock = threading.Lock()
+        # token of the worker which holds the login lock, the calls of one worker can come in different threads
+        self._login_owner: str | None = None
+
+    def get_session(self) -> (int, dict, dict):
+        return self.version, self.headers, self.cookies
+
+    def begin_login(self, seen_version: int) -> str | None:
+        """ Returns a login token if the caller has to log in and then call `finish_login` with it,
+        None if the session was already renewed by another worker """
+        if not self._login_lock.acquire(timeout=self.LOGIN_TIMEOUT):
+            raise SessionLoginTimeout(f'Acunetix login of another worker takes more than {self.LOGIN_TIMEOUT} s',
+                                      retry_after=int(self.LOGIN_TIMEOUT))
+        if self.version > seen_version:
+            self._login_lock.release()
+            return None
+        self._login_owner = uuid.uuid4().hex
+        return self._login_owner
+
+    def finish_login(self, token: str, headers: dict, cookies: dict) -> int:
+        """ Publish the new session and release the login lock. Only the holder of the lock can do it """
+        if token != self._login_owner:
+            return self.version
+        if headers or cookies:
+            self.version += 1
+            self.headers = headers
+            self.cookies = cookies
+        self._login_owner = None
+        self._login_lock.release()
+        return self.version
+
+
+class StateManager(BaseManager):
+    pass
+
+
+_targets_queue = None
+_session_store = None
+
+
+def _get_targets_queue() -> TargetsQueue:
+    global _targets_queue
+    if _targets_queue is None:
+        _targets_queue = TargetsQueue()
+    return _targets_queue
+
+
+def _get_session_store() -> SessionStore:
+    global _session_store
+    if _session_store is None:
+        _session_store = SessionStore()
+    return _session_store
+
+
+StateManager.register('get_targets_queue', callable=_get_targets_queue)
+StateManager.register('get_session_store', callable=_get_session_store)
+
+
+def start_state_service(address: str) -> StateManager:
+    """ Start the shared state service on a local Unix socket. Must be called before the workers are forked """
+    global STATE_SERVICE_ADDRESS
+    if os.path.exists(address):
+        os.remove(address)
+    manager = StateManager(address=address)
+    manager.start()
+    STATE_SERVICE_ADDRESS = address
+    return manager
+
+
+def _connect() -> StateManager:
+    manager = StateManager(address=STATE_SERVICE_ADDRESS)
+    manager.connect()
+    return manager
+
+
+def get_targets_queue() -> TargetsQueue:
+    if STATE_SERVICE_ADDRESS is None:
+        return TargetsQueue()
+    return _connect().get_targets_queue()
+
+
+def get_session_store() -> SessionStore:
+    if STATE_SERVICE_ADDRESS is None:
+        # the request threads of the single process share one login as well
+        return _get_session_store()
+    return _connect().get_session_store()
@@ -1 +1,11 @@
-from .print_output import timed_print
\ No newline at end of file
+from .logger import logger, configure_logging, debug_dump
+from .print_output import timed_print
+from .tracing import span, trace_request, request_profiler, current_request_id, configure_tracing
+from .capture import traffic_recorder, configure_capture, read_trace, decode_body
+
+__all__ = [
+    'logger', 'configure_logging', 'debug_dump',
+    'timed_print',
+    'span', 'trace_request', 'request_profiler', 'current_request_id', 'configure_tracing',
+    'traffic_recorder', 'configure_capture', 'read_trace', 'decode_body',
+]
@@ -0,0 +1,111 @@
+import base64
+import json
+import os
+import threading
+import time
+from typing import Iterator
+
+from core.tools.logger import logger
+from core.tools.tracing import current_request_id
+
+DEFAULT_BODY_LIMIT = 1024 * 1024
+
+
+def encode_body(body: bytes | None) -> dict:
+    """ Text bodies are stored as is, binary ones in base64 """
+    if not body:
+        return {}
+    try:
+        return {'body': body.decode()}
+    except UnicodeDecodeError:
+        return {'body_b64': base64.b64encode(body).decode()}
+
+
+def decode_body(record: dict) -> bytes:
+    if 'body_b64' in record:
+        return base64.b64decode(record['body_b64'])
+    return record.get('body', '').encode()
+
+
+def read_trace(file_path: str) -> Iterator[dict]:
+    with open(file_path) as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+class TrafficRecorder:
+    """
+    Capture mode: every downstream request and the upstream responses it caused are appended to an NDJSON trace.
+    Records are linked by the request id of the tracing context (upstream calls made outside of a request,
+    like the startup or the scan events polling, have no request id). Each record is written with one `write`
+    to a file opened in append mode, so several worker processes can share the trace.
+    Only the first `body_limit` bytes of a downstream body are kept, the record of a longer one is marked truncated.
+    """
+
+    def __init__(self):
+        self.file_path: str | None = None
+        self.body_limit = DEFAULT_BODY_LIMIT
+        self._fd: int | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_active(self) -> bool:
+        return self._fd is not None
+
+    def start(self, file_path: str, body_limit: int = DEFAULT_BODY_LIMIT):
+        self.file_path = file_path
+        self.body_limit = body_limit
+        self._fd = os.open(file_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+        logger.info(f'Traffic is captured to {file_path}')
+
+    def record_downstream(self, method: str, path: str, watcher_uuid: str | None, body: bytes | None,
+                          status: int | None, elapsed_ms: float, body_size: int = None):
+        """ `body_size` is given when `body` is only the prefix of a longer body """
+        record = {
+            'type': 'downstream',
+            'ts': round(time.time() - elapsed_ms / 1000, 6),
+            'request_id': current_request_id(),
+            'method': method,
+            'path': path,
+            'watcher': watcher_uuid,
+            'status': status,
+            'elapsed_ms': round(elapsed_ms, 1),
+            **encode_body(body),
+        }
+        if body_size is not None:
+            record.update(body_truncated=True, body_size=body_size)
+        self._write(record)
+
+    def record_upstream(self, method: str, path: str, status: int, content_type: str | None, body: bytes | None,
+                        elapsed_ms: float, is_streamed: bool = False):
+        record = {
+            'type': 'upstream',
+            'ts': round(time.time() - elapsed_ms / 1000, 6),
+            'request_id': current_request_id(),
+            'method': method,
+            'path': path,
+            'status': status,
+            'content_type': content_type,
+            'elapsed_ms': round(elapsed_ms, 1),
+        }
+        if is_streamed:
+            # streamed downloads are not buffered for the trace
+            record['streamed'] = True
+        else:
+            record.update(encode_body(body))
+        self._write(record)
+
+    def _write(self, record: dict):
+        line = (json.dumps(record, separators=(',', ':')) + '\n').encode()
+        with self._lock:
+            if self._fd is not None:
+                os.write(self._fd, line)
+
+
+traffic_recorder = TrafficRecorder()
+
+
+def configure_capture(file_path: str | None, body_limit: int = DEFAULT_BODY_LIMIT):
+    if file_path:
+        traffic_recorder.start(file_path=file_path, body_limit=body_limit)
@@ -0,0 +1,103 @@
+import atexit
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+LOGGER_NAME = 'acunetix_fake_client'
+LOG_FORMAT = '%(asctime)s %(levelname)s: %(message)s'
+STRUCTURED_FIELDS = ('request_id', 'route', 'watcher', 'target', 'upstream_ms', 'queue_size')
+QUEUE_SIZE = 10000
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+class StructuredFormatter(logging.Formatter):
+    """ Appends known structured fields (passed with `extra`) as `key=value` pairs """
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = super().format(record)
+        fields = [f'{name}={getattr(record, name)}' for name in STRUCTURED_FIELDS
+                  if getattr(record, name, None) is not None]
+        return f'{message} [{" ".join(fields)}]' if fields else message
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Puts records into a bounded in-process queue without formatting them: message formatting and stdout writes
+    are done by the listener thread. Records are dropped when the queue is full instead of blocking the caller.
+    """
+    dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            NonBlockingQueueHandler.dropped += 1
+
+
+class SampledLog:
+    """ Rate-limited sampling: a key is allowed at most once per interval """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._last_time: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def allow(self, key: str) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_time.get(key, -self.interval) < self.interval:
+                return False
+            self._last_time[key] = now
+            return True
+
+
+_listener: QueueListener | None = None
+_debug_dumps = SampledLog(interval=30.0)
+
+
+def configure_logging(level: str | int = logging.INFO):
+    """ (Re)configure the application logger: records are written to stdout by a background listener thread """
+    global _listener
+    if _listener:
+        _listener.stop()
+    log_queue = queue.Queue(maxsize=QUEUE_SIZE)
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(StructuredFormatter(LOG_FORMAT))
+    logger.handlers = [NonBlockingQueueHandler(log_queue)]
+    logger.setLevel(level)
+    logger.propagate = False
+    _listener = QueueListener(log_queue, stream_handler)
+    _listener.start()
+
+
+def _restart_listener_after_fork():
+    # the listener thread is not copied into forked worker processes. The inherited listener is dropped
+    # without `stop()`: it would wait for the missing thread on a queue whose locks can be held since the fork
+    global _listener
+    if _listener:
+        _listener = None
+        configure_logging(level=logger.level)
+
+
+def debug_dump(key: str, message: str, *args, **kwargs):
+    """ Debug dump of large structures: formatted lazily and sampled once per interval for every key """
+    if logger.isEnabledFor(logging.DEBUG) and _debug_dumps.allow(key):
+        logger.debug(message, *args, **kwargs)
+
+
+def _stop_listener():
+    if _listener:
+        _listener.stop()
+
+
+configure_logging()
+atexit.register(_stop_listener)
+os.register_at_fork(after_in_child=_restart_listener_after_fork)
@@ -1,6 +1,7 @@
-from datetime import datetime
 from typing import NoReturn
 
+from core.tools.logger import logger
+
 
 def timed_print(string: str) -> NoReturn:
-    print(f'{datetime.now()}: {string}')
+    logger.info(string)
@@ -0,0 +1,155 @@
+import cProfile
+import logging
+import os
+import pstats
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from core.tools.logger import logger
+
+
+@dataclass
+class Trace:
+    name: str
+    request_id: str
+    started: float = field(default_factory=time.perf_counter)
+    spans: list[tuple[str, float]] = field(default_factory=list)
+
+    @property
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def summary(self) -> str:
+        return ', '.join(f'{name}={duration:.1f}ms' for name, duration in self.spans)
+
+
+_current_trace: ContextVar[Trace | None] = ContextVar('current_trace', default=None)
+slow_request_threshold_ms: float = 1000.0
+
+
+class RequestIdFilter(logging.Filter):
+    """ Adds the current request id to every log record """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, 'request_id', None) is None:
+            trace = _current_trace.get()
+            record.request_id = trace.request_id if trace else None
+        return True
+
+
+def current_request_id() -> str | None:
+    trace = _current_trace.get()
+    return trace.request_id if trace else None
+
+
+@contextmanager
+def trace_request(name: str, request_id: str = None):
+    """ Trace a request: spans opened inside are recorded, slow requests are logged with their breakdown """
+    trace = Trace(name=name, request_id=request_id or uuid.uuid4().hex[:16])
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        elapsed_ms = trace.elapsed_ms
+        if elapsed_ms >= slow_request_threshold_ms:
+            logger.warning(f'Slow request {name} took {elapsed_ms:.1f}ms: {trace.summary()}')
+        elif logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f'Request {name} took {elapsed_ms:.1f}ms: {trace.summary()}')
+        _current_trace.reset(token)
+
+
+@contextmanager
+def span(name: str):
+    """ Time a stage of the current request. Does nothing outside of a traced request """
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.spans.append((name, (time.perf_counter() - started) * 1000))
+
+
+class RequestProfiler:
+    """
+    On-demand cProfile of the next N requests or of the requests during a time window.
+    The collected stats are dumped to `output_dir` when the budget is spent.
+    """
+    TOP_FUNCTIONS = 20
+
+    def __init__(self, output_dir: str = 'profiles'):
+        self.output_dir = output_dir
+        self._requests_left = 0
+        self._deadline: float | None = None
+        self._stats: pstats.Stats | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_active(self) -> bool:
+        return self._requests_left > 0 or (self._deadline is not None and time.monotonic() < self._deadline)
+
+    def enable(self, requests: int = 0, seconds: float = 0):
+        with self._lock:
+            self._requests_left = max(requests, 0)
+            self._deadline = time.monotonic() + seconds if seconds > 0 else None
+            self._stats = None
+        logger.info(f'Profiling enabled for {requests} requests / {seconds} seconds')
+
+    @contextmanager
+    def profile(self):
+        if not self.is_active:
+            if self._deadline is not None:
+                self._finish_window()
+            yield
+            return
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            self._collect(profile=profile)
+
+    def _collect(self, profile: cProfile.Profile):
+        with self._lock:
+            if self._stats is None:
+                self._stats = pstats.Stats(profile)
+            else:
+                self._stats.add(profile)
+            if self._requests_left > 0:
+                self._requests_left -= 1
+            if not self.is_active:
+                self._deadline = None
+                self._dump()
+
+    def _finish_window(self):
+        with self._lock:
+            if self._deadline is not None and not self.is_active:
+                self._deadline = None
+                if self._stats is not None:
+                    self._dump()
+
+    def _dump(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        file_path = os.path.join(self.output_dir, f'profile-{os.getpid()}-{datetime.now():%Y%m%d-%H%M%S}.pstats')
+        self._stats.dump_stats(file_path)
+        logger.info(f'Profile stats saved to {file_path}')
+        self._stats = None
+
+
+request_profiler = RequestProfiler()
+
+
+def configure_tracing(slow_request_ms: float, profile_dir: str):
+    global slow_request_threshold_ms
+    slow_request_threshold_ms = slow_request_ms
+    request_profiler.output_dir = profile_dir
+
+logger.addFilter(RequestIdFilter())
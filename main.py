@@ -3,9 +3,19 @@ from typing import NoReturn
 
 from cli_arguments import CLI_ARGUMENTS
 from core import server
+from core.tools import configure_logging, configure_tracing, configure_capture
 
 
 def main() -> NoReturn:
+    configure_logging(level=CLI_ARGUMENTS.log_level)
+    configure_tracing(slow_request_ms=CLI_ARGUMENTS.slow_request_ms, profile_dir=CLI_ARGUMENTS.profile_dir)
+    configure_capture(file_path=CLI_ARGUMENTS.capture_file, body_limit=CLI_ARGUMENTS.capture_body_limit)
+    if CLI_ARGUMENTS.workers > 1:
+        server.run_workers(listen_host=CLI_ARGUMENTS.listen_host,
+                           listen_port=CLI_ARGUMENTS.listen_port,
+                           workers=CLI_ARGUMENTS.workers,
+                           state_socket=CLI_ARGUMENTS.state_socket)
+        return
     loop = asyncio.new_event_loop()
     loop.run_until_complete(server.socket_listener(listen_host=CLI_ARGUMENTS.listen_host,
                                                    listen_port=CLI_ARGUMENTS.listen_port))
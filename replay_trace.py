@@ -0,0 +1,79 @@
+import argparse
+import json
+import os
+import shlex
+import tempfile
+from typing import NoReturn
+
+from core.replay import TraceReplayer, format_report, run_proxy
+from core.standin import AcunetixStandIn
+from core.tools import configure_logging, timed_print, read_trace
+
+
+def init_args():
+    parser = argparse.ArgumentParser(description='Replay a captured proxy trace (main.py --capture-file) '
+                                                 'against the proxy backed by a local Acunetix stand-in')
+    parser.add_argument('-t', '--trace', required=True, type=str, help='NDJSON trace file')
+    parser.add_argument('-u', '--username', required=True, type=str, help='Proxy user name')
+    parser.add_argument('-p', '--password', required=True, type=str, help='Proxy user password')
+    parser.add_argument('-sp', '--speed', type=float, default=1,
+                        help='Replay speed: 1 - recorded pace, 2 - twice faster, 0 - as fast as possible')
+    parser.add_argument('-ul', '--upstream-latency', type=float, default=1,
+                        help='Scale of the recorded Acunetix latency reproduced by the stand-in (0 - no delay)')
+    parser.add_argument('-lp', '--listen-port', type=int, default=13444, help='Port of the started proxy')
+    parser.add_argument('-pa', '--proxy-args', type=str, default='',
+                        help='Additional main.py arguments, e.g. "--workers 4 --upstream-concurrency 4"')
+    parser.add_argument('-pu', '--proxy-url', type=str, default=None,
+                        help='Replay against an already running proxy instead of starting one '
+                             '(it must use the stand-in: --acunetix-scheme http, see --stand-in-port)')
+    parser.add_argument('-si', '--stand-in-port', type=int, default=0, help='Port of the Acunetix stand-in')
+    parser.add_argument('-o', '--report-file', type=str, default=None, help='Save the replay report (JSON)')
+    parser.add_argument('-b', '--baseline', type=str, default=None, help='Report of a previous replay to compare with')
+    parser.add_argument('-ll', '--log-level', type=str, default='INFO',
+                        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'], help='Logging level')
+    return parser.parse_args()
+
+
+def replay(arguments, records: list[dict], stand_in: AcunetixStandIn, proxy_url: str) -> dict:
+    replayer = TraceReplayer(proxy_url=proxy_url, records=records, stand_in=stand_in,
+                             username=arguments.username, password=arguments.password, speed=arguments.speed)
+    timed_print(f'Replaying {len(replayer.downstream)} requests of {len(replayer.watchers)} watchers '
+                f'(speed {arguments.speed or "max"})')
+    return replayer.run().to_dict()
+
+
+def main() -> NoReturn:
+    arguments = init_args()
+    configure_logging(level=arguments.log_level)
+    records = list(read_trace(arguments.trace))
+    stand_in = AcunetixStandIn(records=records, latency_scale=arguments.upstream_latency)
+    stand_in_port = stand_in.start(port=arguments.stand_in_port)
+    timed_print(f'Acunetix stand-in is listening on 127.0.0.1:{stand_in_port}')
+    try:
+        if arguments.proxy_url:
+            report = replay(arguments, records=records, stand_in=stand_in, proxy_url=arguments.proxy_url)
+        else:
+            main_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py')
+            # the proxy runs in a clean directory, so caches of previous runs do not change the results
+            with tempfile.TemporaryDirectory() as work_dir:
+                with run_proxy(main_path=main_path, username=arguments.username, password=arguments.password,
+                               stand_in_port=stand_in_port, listen_port=arguments.listen_port,
+                               extra_args=shlex.split(arguments.proxy_args), work_dir=work_dir):
+                    report = replay(arguments, records=records, stand_in=stand_in,
+                                    proxy_url=f'http://127.0.0.1:{arguments.listen_port}')
+    finally:
+        stand_in.stop()
+    baseline = None
+    if arguments.baseline:
+        with open(arguments.baseline) as file:
+            baseline = json.load(file)
+    for line in format_report(report=report, baseline=baseline):
+        timed_print(line)
+    if arguments.report_file:
+        with open(arguments.report_file, 'w') as file:
+            json.dump(report, file, indent=2)
+        timed_print(f'Replay report saved to {arguments.report_file}')
+
+
+if __name__ == '__main__':
+    main()
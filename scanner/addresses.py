@@ -0,0 +1,58 @@
+import posixpath
+import re
+import string
+from urllib.parse import urlsplit, urlunsplit
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+PERCENT_ENCODED = re.compile(r'%([0-9A-Fa-f]{2})')
+UNRESERVED_CHARACTERS = frozenset(string.ascii_letters + string.digits + '-._~')
+
+
+def _normalize_percent_encoding(value: str) -> str:
+    """ Decode percent-encoded unreserved characters and upper-case the remaining escapes """
+    def replace(match: re.Match) -> str:
+        char = chr(int(match.group(1), 16))
+        return char if char in UNRESERVED_CHARACTERS else f'%{match.group(1).upper()}'
+
+    return PERCENT_ENCODED.sub(replace, value)
+
+
+def _normalize_path(path: str) -> str:
+    path = _normalize_percent_encoding(path)
+    if not path:
+        return ''
+    path = posixpath.normpath(path)
+    # normpath keeps a leading double slash
+    path = '/' + path.lstrip('/')
+    return '' if path == '/' else path
+
+
+def _normalize_host(host: str) -> str:
+    host = host.lower().rstrip('.')
+    try:
+        host = host.encode('idna').decode('ascii')
+    except UnicodeError:
+        pass
+    return f'[{host}]' if ':' in host else host
+
+
+def normalize_address(address: str) -> str:
+    """Canonical form of a target address, so equivalent addresses map to one target.
+
+    `http://host`, `http://host/`, `HTTP://Host:80` and `host` all become `http://host`:
+    the scheme and the host are lower-cased, the default port, user info, fragment, dot segments,
+    duplicated and trailing slashes are removed. The query string is kept as is.
+    """
+
+    address = address.strip()
+    if '://' not in address:
+        address = f'http://{address}'
+    parts = urlsplit(address)
+    scheme = parts.scheme.lower()
+    host = _normalize_host(parts.hostname or '')
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    netloc = host if port in (None, DEFAULT_PORTS.get(scheme)) else f'{host}:{port}'
+    return urlunsplit((scheme, netloc, _normalize_path(parts.path), parts.query, ''))
@@ -0,0 +1,205 @@
+import enum
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import TYPE_CHECKING
+
+from api.classes.scan_status import FINAL_ACUNETIX_STATUSES, AcunetixScanStatuses
+from api.exceptions import TargetDeletionError
+from core.tools import timed_print
+
+if TYPE_CHECKING:
+    from api.base import AcunetixAPI
+
+
+class LifecycleStages(enum.Enum):
+    PENDING = 'pending'
+    TARGET_CREATED = 'target_created'
+    SCAN_STARTED = 'scan_started'
+    SCAN_FINISHED = 'scan_finished'
+    ARTIFACTS_REQUESTED = 'artifacts_requested'
+    TARGET_DELETED = 'target_deleted'
+    DONE = 'done'
+
+
+# stages in which the host holds an Acunetix target, that is a license slot
+TARGET_STAGES = [LifecycleStages.TARGET_CREATED, LifecycleStages.SCAN_STARTED, LifecycleStages.SCAN_FINISHED,
+                 LifecycleStages.ARTIFACTS_REQUESTED]
+FINAL_ARTIFACT_STATUSES = ['completed', 'failed']
+
+
+class Checkpoint:
+    """ Lifecycle state of every address, saved to a JSON file after each change """
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self._lock = threading.Lock()
+        self.hosts: dict[str, dict] = {}
+        if os.path.exists(file_path):
+            with open(file_path) as file:
+                self.hosts = json.load(file)
+
+    def get(self, address: str) -> dict:
+        with self._lock:
+            return self.hosts.setdefault(address, {'stage': LifecycleStages.PENDING.value})
+
+    def update(self, address: str, **values):
+        with self._lock:
+            self.hosts.setdefault(address, {}).update(values)
+            temp_path = f'{self.file_path}.tmp'
+            with open(temp_path, 'w') as file:
+                json.dump(self.hosts, file, indent=2)
+            os.replace(temp_path, self.file_path)
+
+
+class ScanOrchestrator:
+    """
+    Runs the whole scan lifecycle for a list of addresses:
+    create target -> run scan -> wait for a final status -> request report and export -> delete target -> download.
+
+    Only the steps which need the target hold a license slot: the target is deleted as soon as the report
+    and the export are generated, and the downloads run in a separate pool while the next host is scanned.
+    The state of every host is saved to the checkpoint file, so an interrupted run continues where it stopped.
+    A host which fails after its target is created gets the target deleted and starts over on the next run.
+    """
+
+    def __init__(self,
+                 api: "AcunetixAPI",
+                 checkpoint: Checkpoint,
+                 output_dir: str,
+                 profile_id: str,
+                 report_template_id: str,
+                 export_id: str,
+                 slots: int = 1,
+                 download_workers: int = 2,
+                 poll_interval: float = 30.0,
+                 scan_timeout: float = 12 * 3600,
+                 artifact_timeout: float = 600):
+        self.api = api
+        self.checkpoint = checkpoint
+        self.output_dir = output_dir
+        self.profile_id = profile_id
+        self.report_template_id = report_template_id
+        self.export_id = export_id
+        self.slots = slots
+        self.download_workers = download_workers
+        self.poll_interval = poll_interval
+        self.scan_timeout = scan_timeout
+        self.artifact_timeout = artifact_timeout
+
+    def run(self, addresses: list[str]):
+        os.makedirs(self.output_dir, exist_ok=True)
+        downloads: list[Future] = []
+        with ThreadPoolExecutor(max_workers=self.download_workers, thread_name_prefix='download') as download_pool:
+            def run_host(address: str):
+                if self._run_licensed_stages(address=address):
+                    downloads.append(download_pool.submit(self._run_download, address))
+
+            with ThreadPoolExecutor(max_workers=self.slots, thread_name_prefix='scan') as scan_pool:
+                for future in [scan_pool.submit(run_host, address) for address in addresses]:
+                    future.result()
+            for future in downloads:
+                future.result()
+        timed_print(f'Batch scan finished for {len(addresses)} addresses')
+
+    def _stage(self, address: str) -> LifecycleStages:
+        return LifecycleStages(self.checkpoint.get(address)['stage'])
+
+    def _run_licensed_stages(self, address: str) -> bool:
+        """ Steps which need the Acunetix target. Returns True when the artifacts are ready for download """
+        try:
+            host = self.checkpoint.get(address)
+            if self._stage(address) == LifecycleStages.PENDING:
+                target = self.api.create_target(address=address, description='Batch scan')
+                self.checkpoint.update(address, stage=LifecycleStages.TARGET_CREATED.value, target_id=target.target_id)
+            if self._stage(address) == LifecycleStages.TARGET_CREATED:
+                scan = self.api.run_scan(target_id=host['target_id'], profile_id=self.profile_id,
+                                         report_template_id=self.report_template_id)
+                self.checkpoint.update(address, stage=LifecycleStages.SCAN_STARTED.value, scan_id=scan.scan_id)
+                timed_print(f'{scan} started')
+            if self._stage(address) == LifecycleStages.SCAN_STARTED:
+                status = self._wait_for_scan(scan_id=host['scan_id'])
+                self.checkpoint.update(address, stage=LifecycleStages.SCAN_FINISHED.value, scan_status=status)
+            if self._stage(address) == LifecycleStages.SCAN_FINISHED:
+                if host['scan_status'] == AcunetixScanStatuses.COMPLETED.value:
+                    report = self.api.run_scan_report(scan_id=host['scan_id'], template_id=self.report_template_id)
+                    export = self.api.run_scan_export(scan_id=host['scan_id'], export_id=self.export_id)
+                    self.checkpoint.update(address, report_id=report.report_id, export_id=export.report_id)
+                self.checkpoint.update(address, stage=LifecycleStages.ARTIFACTS_REQUESTED.value)
+            if self._stage(address) == LifecycleStages.ARTIFACTS_REQUESTED:
+                if host.get('report_id'):
+                    self._wait_for_artifact(get_artifact=self.api.get_report, artifact_id=host['report_id'])
+                    self._wait_for_artifact(get_artifact=self.api.get_export, artifact_id=host['export_id'])
+                self._delete_target(target_id=host['target_id'])
+                self.checkpoint.update(address, stage=LifecycleStages.TARGET_DELETED.value)
+            return self._stage(address) == LifecycleStages.TARGET_DELETED
+        except Exception as e:
+            timed_print(f'Batch scan of {address} failed: {e}')
+            self.checkpoint.update(address, error=str(e))
+            if self._stage(address) in TARGET_STAGES:
+                self._release_target(address=address)
+            return False
+
+    def _release_target(self, address: str):
+        """ Delete the target of a failed host, so its license slot is not held until the next run """
+        target_id = self.checkpoint.get(address)['target_id']
+        try:
+            self._delete_target(target_id=target_id)
+        except Exception as e:
+            timed_print(f'Target {target_id} of {address} is not deleted: {e}')
+            return
+        self.checkpoint.update(address, stage=LifecycleStages.PENDING.value, target_id=None, scan_id=None,
+                               scan_status=None, report_id=None, export_id=None)
+
+    def _delete_target(self, target_id: str):
+        response = self.api.delete_request(path=f'targets/{target_id}')
+        # the target may be already deleted by a previous attempt
+        if response.status_code not in (204, 404):
+            raise TargetDeletionError(f'Fail to delete the target {target_id}', status_code=response.status_code)
+
+    def _run_download(self, address: str):
+        host = self.checkpoint.get(address)
+        try:
+            files = []
+            if host.get('report_id'):
+                report = self.api.get_report(report_id=host['report_id'])
+                files += [self._download(link=link, address=address) for link in report.download or []]
+                export = self.api.get_export(export_id=host['export_id'])
+                files += [self._download(link=link, address=address) for link in export.download or []]
+            self.checkpoint.update(address, stage=LifecycleStages.DONE.value, files=files)
+            timed_print(f'Batch scan of {address} is done ({host.get("scan_status")}), files: {files}')
+        except Exception as e:
+            timed_print(f'Download of {address} artifacts failed: {e}')
+            self.checkpoint.update(address, error=str(e))
+
+    def _download(self, link: str, address: str) -> str:
+        safe_address = ''.join(char if char.isalnum() else '_' for char in address)
+        file_path = os.path.join(self.output_dir, f'{safe_address}-{link.split("/")[-1]}')
+        response = self.api.stream_get_request(path=link.removeprefix('/api/v1/'))
+        try:
+            response.raise_for_status()
+            with open(file_path, 'wb') as file:
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    file.write(chunk)
+        finally:
+            response.close()
+        return file_path
+
+    def _wait_for_scan(self, scan_id: str) -> str:
+        deadline = time.monotonic() + self.scan_timeout
+        while True:
+            status = self.api.get_scan(scan_id=scan_id).current_session.status
+            if status in FINAL_ACUNETIX_STATUSES:
+                return status
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f'Scan {scan_id} is not finished in {self.scan_timeout} seconds')
+            time.sleep(self.poll_interval)
+
+    def _wait_for_artifact(self, get_artifact, artifact_id: str):
+        deadline = time.monotonic() + self.artifact_timeout
+        while get_artifact(artifact_id).status not in FINAL_ARTIFACT_STATUSES:
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f'{artifact_id} is not generated in {self.artifact_timeout} seconds')
+            time.sleep(min(self.poll_interval, 5))
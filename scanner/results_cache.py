@@ -0,0 +1,150 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field, asdict
+
+from api.classes.scan_status import AcunetixScanStatuses
+from scanner.addresses import normalize_address
+
+
+@dataclass
+class CachedScanResult:
+    address_key: str
+    profile_id: str
+    target_id: str
+    scan_id: str
+    scan: dict
+    completed_at: float
+    # report template id -> generated report as returned by Acunetix
+    reports: dict[str, dict] = field(default_factory=dict)
+
+
+class ScanResultsCache:
+    """
+    Completed scans keyed by (normalized address, profile). Within the freshness window a new scan request
+    for the same address and profile is answered with the completed scan instead of a new full scan.
+    The generated reports of the cached scans are kept too, their download descriptors stay valid upstream.
+    The cache is saved to a JSON file after every change and loaded on start.
+
+    Args:
+        file_path: JSON file of the cache (`None` - keep in memory only).
+        freshness_seconds: How long a completed scan can be reused (0 - never), counted from the end of the scan.
+    """
+
+    def __init__(self, file_path: str | None, freshness_seconds: float):
+        self.file_path = file_path
+        self.freshness_seconds = freshness_seconds
+        self.results: dict[tuple[str, str], CachedScanResult] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _is_fresh(self, result: CachedScanResult) -> bool:
+        return time.time() - result.completed_at <= self.freshness_seconds
+
+    def find(self, address: str, profile_id: str) -> CachedScanResult | None:
+        """ Fresh result for the address and the profile """
+        with self._lock:
+            result = self.results.get((normalize_address(address), profile_id))
+        return result if result and self._is_fresh(result) else None
+
+    def find_target_id(self, address: str) -> str | None:
+        """ Target of the latest fresh result for the address with any profile (it must be checked upstream) """
+        address_key = normalize_address(address)
+        with self._lock:
+            results = [result for (key, _), result in self.results.items()
+                       if key == address_key and self._is_fresh(result)]
+        result = max(results, key=lambda result: result.completed_at, default=None)
+        return result.target_id if result else None
+
+    def find_by_target(self, target_id: str, profile_id: str) -> CachedScanResult | None:
+        with self._lock:
+            return next((
+                result for result in self.results.values()
+                if result.target_id == target_id and result.profile_id == profile_id and self._is_fresh(result)
+            ), None)
+
+    def find_by_scan(self, scan_id: str) -> CachedScanResult | None:
+        with self._lock:
+            return next((
+                result for result in self.results.values()
+                if result.scan_id == scan_id and self._is_fresh(result)
+            ), None)
+
+    def find_report(self, report_id: str) -> dict | None:
+        with self._lock:
+            return next((
+                report for result in self.results.values() if self._is_fresh(result)
+                for report in result.reports.values() if report.get('report_id') == report_id
+            ), None)
+
+    def store_scan(self, scan: dict, completed_at: float):
+        """ Save a scan returned by Acunetix if it is completed. `completed_at` is the end time of the scan """
+        if time.time() - completed_at > self.freshness_seconds:
+            return
+        session = scan.get('current_session') or {}
+        address = (scan.get('target') or {}).get('address')
+        if session.get('status') != AcunetixScanStatuses.COMPLETED.value or not address:
+            return
+        key = (normalize_address(address), scan.get('profile_id'))
+        with self._lock:
+            known = self.results.get(key)
+            if known and known.scan_id == scan['scan_id']:
+                return
+            self.results[key] = CachedScanResult(address_key=key[0], profile_id=key[1], target_id=scan['target_id'],
+                                                 scan_id=scan['scan_id'], scan=scan, completed_at=completed_at)
+            self._save()
+
+    def is_known_scan(self, scan_id: str) -> bool:
+        with self._lock:
+            return any(result.scan_id == scan_id for result in self.results.values())
+
+    def forget_target(self, target_id: str):
+        """ Drop the results of a target which is removed upstream (its scans and reports are removed too) """
+        self._forget(lambda result: result.target_id == target_id)
+
+    def forget_scan(self, scan_id: str):
+        self._forget(lambda result: result.scan_id == scan_id)
+
+    def _forget(self, condition):
+        with self._lock:
+            keys = [key for key, result in self.results.items() if condition(result)]
+            for key in keys:
+                del self.results[key]
+            if keys:
+                self._save()
+
+    def store_report(self, report: dict):
+        """ Save a generated report of a cached scan """
+        if report.get('status') != 'completed':
+            return
+        scan_ids = set((report.get('source') or {}).get('id_list') or [])
+        with self._lock:
+            for result in self.results.values():
+                if result.scan_id in scan_ids and result.reports.get(report['template_id']) != report:
+                    result.reports[report['template_id']] = report
+                    self._save()
+
+    def find_scan_report(self, scan_id: str, template_id: str) -> dict | None:
+        result = self.find_by_scan(scan_id=scan_id)
+        return result.reports.get(template_id) if result else None
+
+    def _load(self):
+        if not self.file_path or not os.path.exists(self.file_path):
+            return
+        with open(self.file_path) as file:
+            for item in json.load(file):
+                result = CachedScanResult(**item)
+                self.results[(result.address_key, result.profile_id)] = result
+
+    def _save(self):
+        if not self.file_path:
+            return
+        # expired results are not needed after restart
+        results = [asdict(result) for result in self.results.values() if self._is_fresh(result)]
+        # every worker saves the shared file, so each save needs its own temporary file
+        with tempfile.NamedTemporaryFile('w', dir=os.path.dirname(self.file_path) or '.', suffix='.tmp',
+                                         delete=False) as file:
+            json.dump(results, file)
+        os.replace(file.name, self.file_path)
@@ -1,7 +1,13 @@
+import threading
+import time
+import uuid
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from typing import TYPE_CHECKING
 
+from core.tools import logger, debug_dump
+from scanner.addresses import normalize_address
+
 if TYPE_CHECKING:
     from api.classes.target import AcunetixTarget
 
@@ -25,6 +31,10 @@ class ClientTarget:
     target_id: str = None
     order: int = None
     watchers: list[ClientWatcher] = field(default_factory=list)
+    key: str = field(init=False, repr=False, default=None)
+
+    def __post_init__(self):
+        self.key = normalize_address(self.address)
 
     @property
     def watchers_amount(self) -> int:
@@ -38,14 +48,26 @@ class ClientTarget:
             self.watchers.append(watcher)
 
     def remove_watcher(self, watcher: ClientWatcher):
-        print('removing watcher')
-        print(watcher)
+        logger.debug('Removing watcher', extra={'watcher': watcher.uuid, 'target': self.address})
         self.watchers = list(filter(lambda _watcher: _watcher.uuid != watcher.uuid, self.watchers))
 
 class TargetsQueue:
+    """
+    Queue of the clients targets. All state changes are done through methods, so the queue can be served
+    to several worker processes by the shared state service (see `core.state`).
+    """
+    # seconds a request waits for the upstream creation of a target by another request before taking it over
+    CREATING_TIMEOUT = 60
+
     def __init__(self):
         self.targets: list[ClientTarget] = []
         self.watchers: list[ClientWatcher] = []
+        # normalized address -> queue target, equivalent addresses share one queue entry
+        self._index: dict[str, ClientTarget] = {}
+        self._lock = threading.RLock()
+        # normalized address -> token of the request which creates the target upstream
+        self._creating: dict[str, str] = {}
+        self._created = threading.Condition(self._lock)
 
     @staticmethod
     def _init_target(target: dict) -> ClientTarget:
@@ -54,9 +76,15 @@ class TargetsQueue:
         )
 
     def get_watcher(self, client_uuid: str) -> ClientWatcher:
-        return next(filter(lambda watcher: watcher.uuid == client_uuid, self.watchers), None,
-        ) or self._init_watcher(client_uuid=client_uuid)
+        with self._lock:
+            return next(filter(lambda watcher: watcher.uuid == client_uuid, self.watchers), None,
+            ) or self._init_watcher(client_uuid=client_uuid)
 
+    def touch_watcher(self, client_uuid: str) -> ClientWatcher:
+        with self._lock:
+            watcher = self.get_watcher(client_uuid=client_uuid)
+            watcher.update_last_request_time()
+            return watcher
 
     def _init_watcher(self, client_uuid: str) -> ClientWatcher:
         watcher = ClientWatcher(uuid=client_uuid)
@@ -65,46 +93,115 @@ class TargetsQueue:
         return watcher
 
     def _find_target(self, target: ClientTarget) -> ClientTarget | None:
-        return next(filter(lambda item: item.address == target.address, self.targets), None)
+        return self._index.get(target.key)
+
+    def _add_target(self, target: ClientTarget):
+        self.targets.append(target)
+        self._index[target.key] = target
 
+    def _remove_target(self, target: ClientTarget):
+        self.targets = list(filter(lambda item: item.key != target.key, self.targets))
+        self._index.pop(target.key, None)
 
     def check_target(self, target: dict, watcher: ClientWatcher) -> ClientTarget:
-        self.remove_old_watchers()
-        print('self.targets: before checking')
-        print(self.targets)
-        _target = self._init_target(target=target)
-        queue_target = self._find_target(target=_target)
-        if not queue_target:
-            self.targets.append(_target)
-            queue_target = _target
-        print('self.targets: after checking')
-        print(self.targets)
-        queue_target.order = self.targets.index(queue_target)
-        queue_target.add_watcher(watcher=watcher)
-        return queue_target
+        with self._lock:
+            self.remove_old_watchers()
+            _target = self._init_target(target=target)
+            queue_target = self._find_target(target=_target)
+            if not queue_target:
+                self._add_target(target=_target)
+                queue_target = _target
+            queue_target.order = self.targets.index(queue_target)
+            queue_target.add_watcher(watcher=self.get_watcher(client_uuid=watcher.uuid))
+            logger.debug('Target checked', extra={'watcher': watcher.uuid, 'target': queue_target.address,
+                                                  'queue_size': len(self.targets)})
+            debug_dump('targets_queue', 'Targets queue: %s', self.targets)
+            return queue_target
+
+    def set_target_id(self, address: str, target_id: str):
+        with self._lock:
+            if queue_target := self._find_target(target=ClientTarget(address=address)):
+                queue_target.target_id = target_id
+
+    def get_target(self, address: str) -> ClientTarget | None:
+        with self._lock:
+            return self._find_target(target=ClientTarget(address=address))
+
+    def begin_target_creating(self, address: str) -> str | None:
+        """
+        Reserve the upstream creation of the address target, so concurrent requests (of any worker) do not create
+        it twice. Returns a token if the caller has to create the target and then call `finish_target_creating`,
+        None if the target got its id while the caller was waiting for another request to create it.
+        """
+        key = ClientTarget(address=address).key
+        deadline = time.monotonic() + self.CREATING_TIMEOUT
+        with self._created:
+            while key in self._creating:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logger.warning('Target creation takes too long, it is taken over', extra={'target': address})
+                    break
+                self._created.wait(remaining)
+            if (queue_target := self._index.get(key)) and queue_target.target_id:
+                return None
+            token = uuid.uuid4().hex
+            self._creating[key] = token
+            return token
+
+    def finish_target_creating(self, address: str, token: str):
+        """ Release the reservation of `begin_target_creating`, the waiting requests check the target again """
+        key = ClientTarget(address=address).key
+        with self._created:
+            if self._creating.get(key) == token:
+                del self._creating[key]
+                self._created.notify_all()
 
     def delete_target(self, target: dict, watcher: ClientWatcher) -> bool:
-        self.remove_old_watchers()
-        is_target_was_removed = False
-        print('self.targets: before deleting')
-        print(self.targets)
-        _target = self._find_target(target=self._init_target(target=target))
-        _target.remove_watcher(watcher=watcher)
-        if _target.watchers_amount <=0:
-            self.targets = list(filter(lambda item: item.address != _target.address, self.targets))
-            is_target_was_removed = True
-        print('self.targets: after deleting')
-        print(self.targets)
-        return is_target_was_removed
+        with self._lock:
+            self.remove_old_watchers()
+            is_target_was_removed = False
+            _target = self._find_target(target=self._init_target(target=target))
+            if not _target:
+                return True
+            _target.remove_watcher(watcher=watcher)
+            if _target.watchers_amount <=0:
+                self._remove_target(target=_target)
+                is_target_was_removed = True
+            logger.debug(f'Target deleted: {is_target_was_removed}',
+                         extra={'watcher': watcher.uuid, 'target': _target.address, 'queue_size': len(self.targets)})
+            debug_dump('targets_queue', 'Targets queue: %s', self.targets)
+            return is_target_was_removed
 
     def fill_current_targets(self, targets: list["AcunetixTarget"]):
-        for target in targets:
-            self.targets.append(ClientTarget(address=target.address, target_id=target.target_id))
+        with self._lock:
+            for target in targets:
+                if not self._find_target(target=ClientTarget(address=target.address)):
+                    self._add_target(target=ClientTarget(address=target.address, target_id=target.target_id))
+
+    def get_watcher_targets(self, client_uuid: str) -> list[ClientTarget]:
+        with self._lock:
+            return [
+                client_target for client_target in self.targets
+                if any(watcher.uuid == client_uuid for watcher in client_target.watchers)
+            ]
+
+    def release_idle_watchers(self, address: str) -> bool:
+        """ Remove idle watchers of the address targets. Returns True if nobody watches the address anymore """
+        with self._lock:
+            is_allowed_to_remove = True
+            if _client_target := self._find_target(target=ClientTarget(address=address)):
+                for watcher in _client_target.watchers:
+                    if watcher.is_no_requests:
+                        _client_target.remove_watcher(watcher=watcher)
+                if _client_target.watchers_amount > 0:
+                    is_allowed_to_remove = False
+            return is_allowed_to_remove
 
     def remove_old_watchers(self):
-        for _client_target in self.targets:
-            for watcher in _client_target.watchers:
-                if watcher.is_no_requests:
-                    _client_target.remove_watcher(watcher=watcher)
-            if _client_target.watchers_amount <=0:
-                self.targets = list(filter(lambda item: item.address != _client_target.address, self.targets))
\ No newline at end of file
+        with self._lock:
+            for _client_target in self.targets:
+                for watcher in _client_target.watchers:
+                    if watcher.is_no_requests:
+                        _client_target.remove_watcher(watcher=watcher)
+                if _client_target.watchers_amount <=0:
+                    self._remove_target(target=_client_target)
@@ -0,0 +1,196 @@
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from http import server
+
+import pytest
+import requests
+
+from api.base import AcunetixAPI
+from api.core import AcunetixCoreAPI
+from client.body import RequestBody
+
+
+@dataclass
+class ReceivedRequest:
+    method: str
+    path: str
+    headers: dict
+    body: bytes | None
+    error: str | None = None
+
+
+class QuietHTTPServer(server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        """ Connections dropped by the tested client are expected """
+
+
+class FakeAcunetix:
+    """
+    Local HTTP server in place of Acunetix. Answers are set per (method, path) and served in order
+    (the last one is repeated), a path without the query string matches any query.
+    Received requests and body framing errors are kept for assertions.
+    """
+
+    def __init__(self):
+        self.received: list[ReceivedRequest] = []
+        self.answers: dict[tuple[str, str], list[tuple[int, dict, bytes]]] = {}
+        # seconds to wait before answering (method, path)
+        self.delays: dict[tuple[str, str], float] = {}
+        self._server = QuietHTTPServer(('127.0.0.1', 0), self._handler_class())
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def answer(self, method: str, path: str, *answers: tuple[int, dict, bytes]):
+        self.answers[(method, path)] = list(answers)
+
+    def next_answer(self, method: str, path: str) -> tuple[int, dict, bytes]:
+        if method == 'POST' and path == 'me/login':
+            # the real service answers the login with an empty entity
+            return 204, {'X-Auth': 'token', 'Content-Length': '0'}, b''
+        answers = self.answers.get((method, path)) or self.answers.get((method, path.split('?')[0]))
+        if not answers:
+            return 404, {}, b'{}'
+        return answers.pop(0) if len(answers) > 1 else answers[0]
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _answer(self):
+                path = self.path.removeprefix('/api/v1/')
+                request = ReceivedRequest(method=self.command, path=path, headers=dict(self.headers), body=None)
+                fake.received.append(request)
+                try:
+                    request.body = RequestBody(rfile=self.rfile, headers=self.headers).read()
+                except Exception as e:
+                    request.error = repr(e)
+                    self.close_connection = True
+                    self._send(400, {}, b'{"message": "malformed body"}')
+                    return
+                time.sleep(fake.delays.get((self.command, path), 0))
+                self._send(*fake.next_answer(method=self.command, path=path))
+
+            def _send(self, status: int, headers: dict, body: bytes):
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                if 'Content-Length' not in headers:
+                    self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = do_POST = do_PATCH = do_DELETE = _answer
+
+            def log_message(self, format: str, *args):
+                pass
+
+        return Handler
+
+
+@pytest.fixture
+def fake_acunetix():
+    fake = FakeAcunetix()
+    yield fake
+    fake.stop()
+
+
+@pytest.fixture
+def make_api(fake_acunetix):
+    apis = []
+
+    def make(**kwargs) -> AcunetixCoreAPI:
+        api = AcunetixCoreAPI(username='user', password='password', host='127.0.0.1', port=fake_acunetix.port,
+                              secure=False, scheme='http', **kwargs)
+        apis.append(api)
+        return api
+
+    yield make
+    for api in apis:
+        api.close_session()
+
+
+@pytest.fixture
+def acunetix_api(fake_acunetix):
+    """ AcunetixAPI with all the mixins, it checks the connection and updates the profile on start """
+    fake_acunetix.answer('GET', '', (200, {}, b'{}'))
+    fake_acunetix.answer('PATCH', 'me', (204, {}, b''))
+    api = AcunetixAPI(username='user', password='password', host='127.0.0.1', port=fake_acunetix.port,
+                      secure=False, scheme='http')
+    yield api
+    api.close_session()
+
+
+@pytest.fixture(scope='session')
+def proxy_acunetix():
+    fake = FakeAcunetix()
+    yield fake
+    fake.stop()
+
+
+@pytest.fixture(scope='session')
+def proxy_module(proxy_acunetix):
+    """
+    `client.client_base` parses the command line and connects to Acunetix on import,
+    so it is imported once per test session and served by a local proxy server
+    """
+    from core.server import ProxyHTTPServer
+
+    proxy_acunetix.answer('GET', '', (200, {}, b'{}'))
+    proxy_acunetix.answer('PATCH', 'me', (204, {}, b''))
+    proxy_acunetix.answer('GET', 'targets', (200, {}, b'{"targets": []}'))
+    argv = sys.argv
+    sys.argv = ['main.py', '-u', 'user', '-p', 'password', '-ah', '127.0.0.1', '-ap', str(proxy_acunetix.port),
+                '--acunetix-scheme', 'http', '--results-cache', '', '--vulnerabilities-db', ':memory:']
+    try:
+        from client import client_base
+    finally:
+        sys.argv = argv
+    proxy_server = ProxyHTTPServer(('127.0.0.1', 0), client_base.Client)
+    threading.Thread(target=proxy_server.serve_forever, daemon=True).start()
+    yield client_base, f'http://127.0.0.1:{proxy_server.server_address[1]}'
+    proxy_server.shutdown()
+    proxy_server.server_close()
+    client_base.api.close_session()
+
+
+class ProxyClient(requests.Session):
+    """ Downstream client of the tested proxy, paths are relative to its API root """
+
+    def __init__(self, module, url: str):
+        super().__init__()
+        self.trust_env = False
+        self.module = module
+        self.url = url
+
+    def request(self, method: str, path: str, *args, **kwargs) -> requests.Response:
+        return super().request(method, f'{self.url}/api/v1/{path}', *args, **kwargs)
+
+
+@pytest.fixture
+def proxy(proxy_module, proxy_acunetix) -> ProxyClient:
+    """ Proxy with a fresh state: no upstream answers, no queued targets, an empty results cache """
+    from scanner.results_cache import ScanResultsCache
+    from scanner.scanner_base import TargetsQueue
+
+    client_base, url = proxy_module
+    proxy_acunetix.answers.clear()
+    proxy_acunetix.delays.clear()
+    proxy_acunetix.received.clear()
+    client_base.targets_queue = TargetsQueue()
+    client_base.results_cache = ScanResultsCache(file_path=None, freshness_seconds=3600)
+    client = ProxyClient(module=client_base, url=url)
+    yield client
+    client.close()
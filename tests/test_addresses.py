@@ -0,0 +1,33 @@
+import pytest
+
+from scanner.addresses import normalize_address
+from scanner.scanner_base import TargetsQueue
+
+
+@pytest.mark.parametrize('address', [
+    'example.com', 'http://example.com', 'http://example.com/', 'HTTP://Example.COM:80', 'http://user@example.com.',
+    'http://example.com//', 'http://example.com/a/..', 'http://example.com/#fragment',
+])
+def test_equivalent_addresses_have_one_form(address):
+    assert normalize_address(address) == 'http://example.com'
+
+
+@pytest.mark.parametrize('address, expected', [
+    ('https://example.com:8443/a/./b/', 'https://example.com:8443/a/b'),
+    ('https://example.com:443/%7euser/%2f', 'https://example.com/~user/%2F'),
+    ('http://example.com/path?b=2&a=1', 'http://example.com/path?b=2&a=1'),
+    ('http://[::1]:8080/', 'http://[::1]:8080'),
+    ('http://bücher.example/', 'http://xn--bcher-kva.example'),
+])
+def test_significant_parts_are_kept(address, expected):
+    assert normalize_address(address) == expected
+
+
+def test_equivalent_addresses_share_one_queue_target():
+    queue = TargetsQueue()
+    first = queue.check_target(target={'address': 'http://example.com/'}, watcher=queue.get_watcher('first'))
+    second = queue.check_target(target={'address': 'EXAMPLE.com'}, watcher=queue.get_watcher('second'))
+
+    assert first is second
+    assert len(queue.targets) == 1
+    assert [watcher.uuid for watcher in first.watchers] == ['first', 'second']
@@ -0,0 +1,96 @@
+import threading
+import time
+
+import pytest
+
+from api.admission import AdmissionController, RequestPriority, upstream_priority
+from api.exceptions import AdmissionRejected
+
+BODY = b'x' * 200000
+
+
+def test_overflow_is_rejected_fast():
+    admission = AdmissionController(max_concurrency=1, max_queue=0)
+    with admission.admit(method='GET', path='scans'):
+        with pytest.raises(AdmissionRejected) as error:
+            with admission.admit(method='GET', path='scans'):
+                pass
+    assert error.value.status_code == 503
+    with admission.admit(method='GET', path='scans'):
+        pass
+
+
+def test_waiting_requests_are_admitted_by_priority():
+    admission = AdmissionController(max_concurrency=1, max_queue=4, queue_timeout=5)
+    admitted = []
+
+    def request(priority: RequestPriority):
+        with upstream_priority(priority), admission.admit(method='GET', path='scans'):
+            admitted.append(priority)
+
+    with admission.admit(method='GET', path='scans'):
+        threads = [threading.Thread(target=request, args=(priority,))
+                   for priority in (RequestPriority.LOW, RequestPriority.HIGH)]
+        for thread in threads:
+            thread.start()
+        while len(admission._waiters) < 2:
+            threading.Event().wait(0.01)
+    for thread in threads:
+        thread.join()
+    assert admitted == [RequestPriority.HIGH, RequestPriority.LOW]
+
+
+def test_rate_limit_rejects_long_waits():
+    admission = AdmissionController(rate=1, burst=1, max_rate_wait=0.1)
+    with admission.admit(method='GET', path='targets'):
+        pass
+    with pytest.raises(AdmissionRejected) as error:
+        with admission.admit(method='GET', path='targets'):
+            pass
+    assert error.value.status_code == 429
+
+
+@pytest.mark.parametrize('finish', [
+    lambda response: response.close(),
+    lambda response: b''.join(response.iter_content(chunk_size=4096)),
+])
+def test_streamed_response_holds_its_slot_until_it_is_closed_or_consumed(fake_acunetix, make_api, finish):
+    api = make_api(admission=AdmissionController(max_concurrency=1, max_queue=0))
+    fake_acunetix.answer('GET', 'download', (200, {}, BODY))
+
+    response = api.stream_get_request('download')
+    with pytest.raises(AdmissionRejected):
+        api.get_request('download')
+
+    finish(response)
+    assert api.admission._active == 0
+    assert api.get_request('download').content == BODY
+    response.close()
+    assert api.admission._active == 0
+
+
+def get_concurrently(proxy, path: str, amount: int) -> list[int]:
+    statuses = []
+    threads = [threading.Thread(target=lambda: statuses.append(proxy.get(path).status_code)) for _ in range(amount)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sorted(statuses)
+
+
+def test_proxy_serves_concurrent_requests(proxy, proxy_acunetix):
+    proxy_acunetix.answer('GET', 'vulnerabilities', (200, {}, b'{}'))
+    proxy_acunetix.delays[('GET', 'vulnerabilities')] = 0.3
+
+    started = time.monotonic()
+    assert get_concurrently(proxy, 'vulnerabilities', amount=4) == [200] * 4
+    assert time.monotonic() - started < 1
+
+
+def test_proxy_rejects_the_overflow_of_concurrent_requests(proxy, proxy_acunetix, monkeypatch):
+    monkeypatch.setattr(proxy.module.api, 'admission', AdmissionController(max_concurrency=1, max_queue=0))
+    proxy_acunetix.answer('GET', 'vulnerabilities', (200, {}, b'{}'))
+    proxy_acunetix.delays[('GET', 'vulnerabilities')] = 0.3
+
+    assert get_concurrently(proxy, 'vulnerabilities', amount=2) == [200, 503]
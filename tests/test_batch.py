@@ -0,0 +1,40 @@
+import pytest
+
+
+def test_batch_returns_every_path_and_reads_duplicates_once(proxy, proxy_acunetix):
+    proxy_acunetix.answer('GET', 'scans', (200, {}, b'{"scans": []}'))
+    proxy_acunetix.answer('GET', 'targets/t1', (404, {}, b'{"message": "not found"}'))
+
+    response = proxy.post('fake/batch', json={'paths': ['scans', '/api/v1/scans', 'targets/t1']})
+
+    assert response.status_code == 200
+    assert response.json() == {'responses': [
+        {'path': 'scans', 'status_code': 200, 'body': {'scans': []}},
+        {'path': '/api/v1/scans', 'status_code': 200, 'body': {'scans': []}},
+        {'path': 'targets/t1', 'status_code': 404, 'body': {'message': 'not found'}},
+    ]}
+    assert sorted(request.path for request in proxy_acunetix.received) == ['scans', 'targets/t1']
+
+
+@pytest.mark.parametrize('body', [
+    b'{"paths": ["scans"',
+    b'[]',
+    b'"scans"',
+    b'{"paths": "scans"}',
+    b'{"paths": ["scans", 1]}',
+    b'{"paths": [' + b', '.join([b'"scans"'] * 101) + b']}',
+])
+def test_bad_batch_body_is_a_client_error(proxy, proxy_acunetix, body):
+    response = proxy.post('fake/batch', data=body)
+
+    assert response.status_code == 400
+    assert 'response' in response.json()
+    assert not proxy_acunetix.received
+
+
+@pytest.mark.parametrize('path', ['scans', 'me/login', 'targets?watcher_uuid=watcher'])
+def test_malformed_json_is_a_client_error(proxy, path):
+    response = proxy.post(path, data=b'{"target_id": ')
+
+    assert response.status_code == 400
+    assert 'not valid JSON' in response.json()['response']
@@ -0,0 +1,94 @@
+import json
+
+import api.core
+from api.core import AcunetixCoreAPI
+from core.replay import TraceReplayer
+from core.standin import AcunetixStandIn
+from core.tools import trace_request, read_trace, decode_body
+from core.tools.capture import TrafficRecorder
+
+BINARY = bytes(range(256))
+
+
+def upstream(method: str, path: str, status: int, body: bytes = b'{}', request_id: str = None) -> dict:
+    record = {'type': 'upstream', 'ts': 0.0, 'request_id': request_id, 'method': method, 'path': path,
+              'status': status, 'content_type': 'application/json', 'elapsed_ms': 1.0}
+    return {**record, 'body': body.decode()} if body else record
+
+
+def test_upstream_calls_are_recorded_with_their_request(fake_acunetix, make_api, tmp_path, monkeypatch):
+    recorder = TrafficRecorder()
+    recorder.start(file_path=str(tmp_path / 'trace.ndjson'))
+    monkeypatch.setattr(api.core, 'traffic_recorder', recorder)
+    fake_acunetix.answer('GET', 'reports/download/file', (200, {'Content-Type': 'application/pdf'}, BINARY))
+    client_api = make_api()
+
+    with trace_request(name='GET reports/download/file', request_id='request-1'):
+        client_api.get_request('reports/download/file')
+    recorder.record_downstream(method='GET', path='reports/download/file', watcher_uuid='watcher', body=None,
+                               status=200, elapsed_ms=5)
+
+    first, second = read_trace(recorder.file_path)
+    assert (first['type'], first['request_id'], first['status']) == ('upstream', 'request-1', 200)
+    assert 'body_b64' in first and decode_body(first) == BINARY
+    assert (second['type'], second['watcher'], second['path']) == ('downstream', 'watcher', 'reports/download/file')
+
+
+def test_stand_in_serves_the_recorded_responses_in_order():
+    stand_in = AcunetixStandIn(records=[upstream('GET', 'scans', 200, b'{"scans": [1]}'),
+                                        upstream('GET', 'scans', 200, b'{"scans": [2]}')], latency_scale=0)
+    port = stand_in.start()
+    client_api = AcunetixCoreAPI(username='user', password='password', host='127.0.0.1', port=port, secure=False,
+                                 scheme='http')
+    try:
+        client_api._login()
+        answers = [client_api.get_request('scans').json() for _ in range(3)]
+        missing = client_api.get_request('targets')
+    finally:
+        client_api.close_session()
+        stand_in.stop()
+
+    assert answers == [{'scans': [1]}, {'scans': [2]}, {'scans': [2]}]
+    assert missing.status_code == 404
+    assert stand_in.logins_count == 1
+    assert stand_in.missing == {'GET targets': 1}
+
+
+def test_replay_reports_mismatches_and_queue_orders(fake_acunetix):
+    records = [
+        {'type': 'downstream', 'ts': 1.0, 'request_id': 'r1', 'method': 'POST', 'path': 'targets',
+         'watcher': 'recorded-watcher', 'status': 200, 'elapsed_ms': 3, 'body': '{"address": "example.com"}'},
+        {'type': 'downstream', 'ts': 2.0, 'request_id': 'r2', 'method': 'GET', 'path': 'scans/s1',
+         'watcher': None, 'status': 200, 'elapsed_ms': 3},
+        {'type': 'downstream', 'ts': 3.0, 'request_id': None, 'method': 'GET', 'path': 'fake/events',
+         'watcher': 'recorded-watcher', 'status': 200, 'elapsed_ms': 3},
+        upstream('GET', 'scans/s1', 200, request_id='r2'),
+    ]
+    fake_acunetix.answer('POST', 'targets', (200, {}, b'{"order": 2}'))
+    fake_acunetix.answer('GET', 'scans/s1', (503, {}, b'{}'))
+    replayer = TraceReplayer(proxy_url=f'http://127.0.0.1:{fake_acunetix.port}', records=records,
+                             stand_in=AcunetixStandIn(records=records), username='user', password='password', speed=0)
+
+    report = replayer.run().to_dict()
+
+    assert (report['requests'], report['skipped'], report['errors']) == (2, 1, 0)
+    assert report['status_mismatches'] == {'GET scans/s1: 200 -> 503': 1}
+    assert report['targets_queue'] == {'orders': {'2': 1}, 'queued': 1, 'license_conflicts': 0}
+    assert report['upstream']['recorded_amplification'] == 0.33
+    sent = {request.path for request in fake_acunetix.received}
+    assert f'targets?watcher_uuid={replayer.watchers["recorded-watcher"]}' in sent
+    assert 'recorded-watcher' not in replayer.watchers.values()
+
+
+def test_large_downstream_body_is_truncated_in_the_trace(proxy, proxy_acunetix, tmp_path, monkeypatch):
+    recorder = TrafficRecorder()
+    recorder.start(file_path=str(tmp_path / 'trace.ndjson'), body_limit=16)
+    monkeypatch.setattr(proxy.module, 'traffic_recorder', recorder)
+    proxy_acunetix.answer('POST', 'targets', (201, {}, b'{"target_id": "t1", "address": "http://x/"}'))
+    body = json.dumps({'address': 'http://x/', 'description': 'x' * 1000}).encode()
+
+    assert proxy.post('targets?watcher_uuid=watcher', data=body).ok
+
+    record = next(record for record in read_trace(recorder.file_path) if record['type'] == 'downstream')
+    assert decode_body(record) == body[:16]
+    assert record['body_truncated'] and record['body_size'] == len(body)
@@ -0,0 +1,81 @@
+import socket
+
+import pytest
+import requests
+
+from api.circuit_breaker import CircuitBreaker, CircuitStates
+from api.core import AcunetixCoreAPI
+from api.exceptions import CircuitOpenError
+
+
+def open_breaker(**kwargs) -> CircuitBreaker:
+    breaker = CircuitBreaker(min_calls=1, **kwargs)
+    breaker.record(is_failure=True)
+    assert breaker.state == CircuitStates.OPEN
+    return breaker
+
+
+def test_opens_when_failure_rate_reaches_threshold():
+    breaker = CircuitBreaker(failure_rate_threshold=0.5, min_calls=4)
+    for is_failure in (False, True, False):
+        breaker.record(is_failure=is_failure)
+    assert breaker.state == CircuitStates.CLOSED
+    breaker.record(is_failure=True)
+    assert breaker.state == CircuitStates.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_slow_and_server_error_responses_are_failures():
+    breaker = CircuitBreaker(slow_call_ms=100, min_calls=2, failure_rate_threshold=1)
+    breaker.record_response(status_code=200, elapsed_ms=150)
+    breaker.record_response(status_code=503, elapsed_ms=1)
+    assert breaker.state == CircuitStates.OPEN
+
+
+def test_half_open_probe_closes_or_reopens():
+    breaker = open_breaker(open_seconds=0)
+    breaker.before_call()
+    assert breaker.state == CircuitStates.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record(is_failure=True)
+    assert breaker.state == CircuitStates.OPEN
+
+    breaker.before_call()
+    breaker.record(is_failure=False)
+    assert breaker.state == CircuitStates.CLOSED
+
+
+def test_probe_is_released_when_the_call_fails_outside_of_requests(fake_acunetix, make_api):
+    breaker = open_breaker(open_seconds=0)
+    api = make_api(circuit_breaker=breaker)
+    fake_acunetix.answer('GET', 'scans', (401, {}, b'{}'), (200, {}, b'{"scans": []}'))
+
+    def broken_login():
+        raise RuntimeError('login failed')
+
+    api._login = broken_login
+    with pytest.raises(RuntimeError):
+        api.get_request('scans')
+    assert breaker.state == CircuitStates.HALF_OPEN
+
+    # the probe slot is free again: the next call is let through and closes the circuit
+    assert api.get_request('scans').status_code == 200
+    assert breaker.state == CircuitStates.CLOSED
+
+
+def test_hung_upstream_times_out_and_opens_the_circuit():
+    breaker = CircuitBreaker(min_calls=1)
+    # connections are accepted by the listening socket, nothing is ever answered
+    with socket.create_server(('127.0.0.1', 0)) as hung_server:
+        api = AcunetixCoreAPI(username='user', password='password', host='127.0.0.1',
+                              port=hung_server.getsockname()[1], secure=False, scheme='http',
+                              circuit_breaker=breaker, timeout=(1, 0.2))
+        with pytest.raises(requests.Timeout):
+            api.get_request('scans')
+        api.close_session()
+
+    assert breaker.state == CircuitStates.OPEN
+    with pytest.raises(CircuitOpenError):
+        api.get_request('scans')
@@ -0,0 +1,13 @@
+import sys
+
+import batch_scan
+
+
+def test_batch_scan_uses_the_shared_acunetix_arguments(monkeypatch):
+    monkeypatch.setattr(sys, 'argv', ['batch_scan.py', '-u', 'user', '-p', 'password', '-ah', 'acunetix', '-ap', '3443',
+                                      '-as', 'http', '-ll', 'DEBUG', '-i', 'addresses.txt'])
+
+    arguments = batch_scan.init_args()
+
+    assert (arguments.username, arguments.acunetix_host, arguments.acunetix_port) == ('user', 'acunetix', 3443)
+    assert (arguments.acunetix_scheme, arguments.log_level, arguments.input) == ('http', 'DEBUG', 'addresses.txt')
@@ -0,0 +1,56 @@
+import pytest
+
+
+@pytest.mark.parametrize('method, path', [
+    ('POST', 'targets'),
+    ('GET', 'fake/events'),
+])
+def test_request_without_watcher_is_answered_unauthorised(proxy, method, path):
+    response = proxy.request(method, path, json={'address': 'https://example.com'})
+
+    assert response.status_code == 401
+    assert response.json() == {'response': 'Unauthorized'}
+
+
+def test_wrong_credentials_are_answered_unauthorised(proxy):
+    response = proxy.post('me/login', json={'email': 'user', 'password': 'wrong'})
+
+    assert response.status_code == 401
+    assert response.json() == {'response': 'Unauthorized'}
+
+
+def test_scan_without_target_is_answered_not_found(proxy):
+    response = proxy.post('scans', json={})
+
+    assert response.status_code == 404
+    assert response.json() == {'response': 'Not found'}
+
+
+def test_profiling_endpoint_is_off_by_default(proxy, monkeypatch):
+    calls = []
+    monkeypatch.setattr(proxy.module.request_profiler, 'enable', lambda **kwargs: calls.append(kwargs))
+
+    response = proxy.post('fake/profile?watcher_uuid=watcher', json={'requests': 10})
+
+    assert response.status_code == 404
+    assert not calls
+
+
+def test_profiling_endpoint_can_be_enabled(proxy, monkeypatch):
+    calls = []
+    monkeypatch.setattr(proxy.module.request_profiler, 'enable', lambda **kwargs: calls.append(kwargs))
+    monkeypatch.setattr(proxy.module.CLI_ARGUMENTS, 'profiling_endpoint', True)
+
+    response = proxy.post('fake/profile?watcher_uuid=watcher', json={'requests': 10})
+
+    assert response.status_code == 200
+    assert calls == [{'requests': 10, 'seconds': 0}]
+
+
+def test_vulnerabilities_of_an_unknown_scan_are_not_found(proxy, proxy_acunetix):
+    proxy_acunetix.answer('GET', 'scans/missing', (404, {}, b'{"code": 404, "message": "Object not found"}'))
+
+    response = proxy.get('fake/vulnerabilities', params={'scan_id': 'missing'})
+
+    assert response.status_code == 404
+    assert response.json() == {'response': 'Scan missing is not found'}
@@ -0,0 +1,95 @@
+import json
+import socket
+
+import pytest
+
+from client.events import ScanEventsHub
+from scanner.scanner_base import TargetsQueue
+
+
+def scans(progress: int) -> bytes:
+    scan = {'scan_id': 's1', 'target_id': 't1', 'profile_id': 'p1', 'report_template_id': 'template',
+            'max_scan_time': 0, 'incremental': False,
+            'current_session': {'status': 'processing', 'progress': progress}}
+    return json.dumps({'scans': [scan]}).encode()
+
+
+def read_events(sock: socket.socket, count: int, timeout: float = 2.0) -> list[bytes]:
+    sock.settimeout(timeout)
+    data = b''
+    while data.count(b'\n\n') < count:
+        data += sock.recv(4096)
+    return data.split(b'\n\n')[:count]
+
+
+def event_id(event: bytes) -> int:
+    return int(event.split(b'\n')[0].removeprefix(b'id: '))
+
+
+def assert_silent(sock: socket.socket, seconds: float):
+    sock.settimeout(seconds)
+    with pytest.raises(socket.timeout):
+        sock.recv(4096)
+
+
+@pytest.fixture
+def events_hub(acunetix_api) -> ScanEventsHub:
+    queue = TargetsQueue()
+    queue.check_target(target={'address': 'http://x/'}, watcher=queue.get_watcher('watcher'))
+    queue.set_target_id(address='http://x/', target_id='t1')
+    return ScanEventsHub(api=acunetix_api, targets_queue=queue, poll_interval=0.05, heartbeat_interval=60)
+
+
+@pytest.fixture
+def subscribe(events_hub):
+    sockets = []
+
+    def subscribe(last_event_id: int = None) -> socket.socket:
+        client_sock, hub_sock = socket.socketpair()
+        sockets.append(client_sock)
+        events_hub.subscribe(sock=hub_sock, watcher_uuid='watcher', last_event_id=last_event_id)
+        return client_sock
+
+    yield subscribe
+    for sock in sockets:
+        sock.close()
+
+
+def test_event_is_pushed_only_when_the_scan_changes(fake_acunetix, subscribe):
+    fake_acunetix.answer('GET', 'scans', (200, {}, scans(progress=10)))
+    sock = subscribe()
+
+    first, = read_events(sock, count=1)
+    assert event_id(first) == 1 and b'"progress": 10' in first
+    assert_silent(sock, seconds=0.3)
+    assert len([request for request in fake_acunetix.received if request.path == 'scans']) > 2
+
+    fake_acunetix.answer('GET', 'scans', (200, {}, scans(progress=50)))
+    second, = read_events(sock, count=1)
+    assert event_id(second) == 2 and b'"progress": 50' in second
+
+
+def test_heartbeat_is_sent_while_the_scan_is_unchanged(fake_acunetix, events_hub, subscribe):
+    events_hub.heartbeat_interval = 0.1
+    fake_acunetix.answer('GET', 'scans', (200, {}, scans(progress=10)))
+    sock = subscribe()
+
+    event, heartbeat = read_events(sock, count=2)
+
+    assert event_id(event) == 1
+    assert heartbeat == b': heartbeat'
+
+
+def test_reconnected_subscriber_resumes_after_its_last_event(fake_acunetix, subscribe):
+    sock = subscribe()
+    for progress in (10, 20, 30):
+        fake_acunetix.answer('GET', 'scans', (200, {}, scans(progress=progress)))
+        read_events(sock, count=1)
+
+    resumed = subscribe(last_event_id=1)
+    assert [event_id(event) for event in read_events(resumed, count=2)] == [2, 3]
+    assert_silent(resumed, seconds=0.2)
+
+    new = subscribe()
+    assert [event_id(event) for event in read_events(new, count=1)] == [3]
+    assert_silent(new, seconds=0.2)
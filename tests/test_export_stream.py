@@ -0,0 +1,88 @@
+import json
+
+import pytest
+
+from api.classes.export import AcunetixExportReport
+from api.constants import ExportTypes
+from api.export_stream import JsonArrayItemsStream
+
+DOCUMENT = json.dumps({
+    'export': {'vulnerabilities': [{'vt_id': 'a', 'cvss': 7.5, 'tags': ['x', 'y]']}, 3.25, -1e-3, True, None, 'text']},
+    'locations': [{'loc_id': 1, 'path': '/a "b"'}],
+    'other': [1, 2],
+}).encode()
+EXPECTED = [('vulnerabilities', {'vt_id': 'a', 'cvss': 7.5, 'tags': ['x', 'y]']}), ('vulnerabilities', 3.25),
+            ('vulnerabilities', -1e-3), ('vulnerabilities', True), ('vulnerabilities', None),
+            ('vulnerabilities', 'text'), ('locations', {'loc_id': 1, 'path': '/a "b"'})]
+
+
+def split(data: bytes, size: int) -> list[bytes]:
+    return [data[index:index + size] for index in range(0, len(data), size)]
+
+
+def test_number_split_between_chunks_is_decoded_whole():
+    chunks = split(b'{"vulnerabilities": [3.25]}', 1)
+    assert list(JsonArrayItemsStream(chunks)) == [('vulnerabilities', 3.25)]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 7, 64, len(DOCUMENT)])
+def test_items_do_not_depend_on_chunk_boundaries(chunk_size):
+    assert list(JsonArrayItemsStream(split(DOCUMENT, chunk_size))) == EXPECTED
+
+
+def test_truncated_document_is_an_error():
+    with pytest.raises(ValueError):
+        list(JsonArrayItemsStream(split(DOCUMENT[:-20], 5)))
+
+
+def test_rejected_streamed_response_is_closed_before_the_retry(fake_acunetix, make_api):
+    api = make_api()
+    fake_acunetix.answer('GET', 'export', (401, {}, b'{"message": "expired"}'), (200, {}, DOCUMENT))
+    responses = []
+    send = api.session.request
+
+    def request(*args, **kwargs):
+        responses.append(send(*args, **kwargs))
+        return responses[-1]
+
+    api.session.request = request
+    response = api.stream_get_request('export')
+
+    assert response.status_code == 200
+    assert responses[0].raw.closed
+    response.close()
+
+
+def csv_export(rows: int) -> bytes:
+    lines = ['\ufeffvt_id,name,description'] + [f'{index},"name, {index}","line\nbreak ✓"' for index in range(rows)]
+    return '\r\n'.join(lines).encode() + b'\r\n'
+
+
+def export_report(template_id: str, link: str) -> AcunetixExportReport:
+    return AcunetixExportReport(download=[link], generation_date='', report_id='e1', template_id=template_id,
+                                template_name='', template_type=0, status='completed',
+                                source={'list_type': 'scan_result', 'id_list': ['s1']})
+
+
+@pytest.mark.parametrize('rows', [1, 2, 5000])
+def test_csv_export_is_streamed_row_by_row(proxy, proxy_acunetix, rows):
+    proxy_acunetix.answer('GET', 'exports/download/e1.csv', (200, {'Content-Type': 'text/csv'}, csv_export(rows)))
+    export = export_report(ExportTypes.CSV_VULNERABILITIES.value, '/api/v1/exports/download/e1.csv')
+
+    records = list(proxy.module.api.stream_export(export=export))
+
+    assert len(records) == rows
+    assert records[-1] == {'record_type': 'vulnerabilities', 'vt_id': str(rows - 1), 'name': f'name, {rows - 1}',
+                           'description': 'line\nbreak ✓'}
+    assert proxy.module.api.admission._active == 0
+
+
+def test_json_export_is_streamed(proxy, proxy_acunetix):
+    proxy_acunetix.answer('GET', 'exports/download/e1.json', (200, {}, DOCUMENT))
+    export = export_report(ExportTypes.JSON.value, '/api/v1/exports/download/e1.json')
+
+    records = list(proxy.module.api.stream_export(export=export))
+
+    assert records[0] == {'record_type': 'vulnerabilities', 'vt_id': 'a', 'cvss': 7.5, 'tags': ['x', 'y]']}
+    assert records[1] == {'record_type': 'vulnerabilities', 'value': 3.25}
+    assert len(records) == len(EXPECTED)
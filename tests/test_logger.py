@@ -0,0 +1,48 @@
+import importlib
+import os
+import signal
+
+import pytest
+
+logger_module = importlib.import_module('core.tools.logger')
+
+
+class InheritedListener:
+    """ Listener copied into a forked child: its thread does not exist there """
+
+    def stop(self):
+        raise AssertionError('the inherited listener must not be stopped')
+
+
+def test_forked_child_starts_a_new_listener_without_stopping_the_inherited_one():
+    level = logger_module.logger.level
+    logger_module._stop_listener()
+    logger_module._listener = InheritedListener()
+    try:
+        logger_module._restart_listener_after_fork()
+
+        assert isinstance(logger_module._listener, logger_module.QueueListener)
+        assert logger_module.logger.handlers[0].queue is logger_module._listener.queue
+    finally:
+        logger_module.configure_logging(level=level)
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='fork is not available')
+def test_forked_child_can_log():
+    read_end, write_end = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        # the listener of the child was started by the fork hook, a deadlock ends the child by the alarm
+        signal.alarm(10)
+        os.close(read_end)
+        logger_module._listener.handlers[0].setStream(os.fdopen(write_end, 'w'))
+        logger_module.logger.info('child message')
+        logger_module._stop_listener()
+        logger_module._listener.handlers[0].flush()
+        os._exit(0)
+    os.close(write_end)
+    with os.fdopen(read_end) as output:
+        text = output.read()
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+    assert 'child message' in text
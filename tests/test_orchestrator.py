@@ -0,0 +1,104 @@
+import json
+
+import pytest
+
+from scanner.orchestrator import Checkpoint, LifecycleStages, ScanOrchestrator
+
+ADDRESS = 'https://example.com/'
+
+
+def encode(data: dict) -> bytes:
+    return json.dumps(data).encode()
+
+
+def scan(status: str) -> bytes:
+    return encode({'scan_id': 's1', 'target_id': 't1', 'profile_id': 'p1', 'report_template_id': 'template',
+                   'max_scan_time': 0, 'incremental': False, 'current_session': {'status': status}})
+
+
+def artifact(artifact_id: str, status: str, download: list[str] = None) -> bytes:
+    return encode({'report_id': artifact_id, 'status': status, 'download': download, 'generation_date': '',
+                   'template_id': 'template', 'template_name': 'template', 'template_type': 0,
+                   'source': {'list_type': 'scan_result', 'id_list': ['s1']}})
+
+
+@pytest.fixture
+def make_orchestrator(acunetix_api, tmp_path):
+    def make(**kwargs) -> ScanOrchestrator:
+        return ScanOrchestrator(api=acunetix_api, checkpoint=Checkpoint(file_path=str(tmp_path / 'checkpoint.json')),
+                                output_dir=str(tmp_path / 'reports'), profile_id='p1', report_template_id='template',
+                                export_id='json', poll_interval=0.01, **kwargs)
+
+    return make
+
+
+def answer_scan_lifecycle(fake_acunetix):
+    fake_acunetix.answer('POST', 'targets', (201, {}, encode({'target_id': 't1', 'address': ADDRESS,
+                                                                'fqdn': 'example.com'})))
+    fake_acunetix.answer('POST', 'scans', (201, {}, scan('scheduled')))
+    fake_acunetix.answer('GET', 'scans/s1', (200, {}, scan('processing')), (200, {}, scan('completed')))
+    fake_acunetix.answer('POST', 'reports', (201, {}, artifact('r1', 'queued')))
+    fake_acunetix.answer('POST', 'exports', (201, {}, artifact('e1', 'queued')))
+    fake_acunetix.answer('GET', 'reports/r1', (200, {}, artifact('r1', 'processing')),
+                         (200, {}, artifact('r1', 'completed', ['/api/v1/reports/download/r1.html'])))
+    fake_acunetix.answer('GET', 'exports/e1',
+                         (200, {}, artifact('e1', 'completed', ['/api/v1/exports/download/e1.json'])))
+    fake_acunetix.answer('DELETE', 'targets/t1', (204, {}, b''))
+    fake_acunetix.answer('GET', 'reports/download/r1.html', (200, {}, b'<html></html>'))
+    fake_acunetix.answer('GET', 'exports/download/e1.json', (200, {}, b'{}'))
+
+
+def sent(fake_acunetix) -> list[tuple[str, str]]:
+    return [(request.method, request.path) for request in fake_acunetix.received]
+
+
+def test_target_is_deleted_before_the_artifacts_are_downloaded(fake_acunetix, make_orchestrator):
+    answer_scan_lifecycle(fake_acunetix)
+    orchestrator = make_orchestrator()
+
+    orchestrator.run(addresses=[ADDRESS])
+
+    host = orchestrator.checkpoint.get(ADDRESS)
+    assert host['stage'] == LifecycleStages.DONE.value
+    assert [open(file, 'rb').read() for file in host['files']] == [b'<html></html>', b'{}']
+    sent_requests = sent(fake_acunetix)
+    assert sent_requests.index(('DELETE', 'targets/t1')) < sent_requests.index(('GET', 'reports/download/r1.html'))
+
+
+def test_interrupted_run_is_resumed_from_the_checkpoint(fake_acunetix, make_orchestrator, tmp_path):
+    answer_scan_lifecycle(fake_acunetix)
+    with open(tmp_path / 'checkpoint.json', 'w') as file:
+        json.dump({ADDRESS: {'stage': LifecycleStages.SCAN_STARTED.value, 'target_id': 't1', 'scan_id': 's1'}}, file)
+
+    make_orchestrator().run(addresses=[ADDRESS])
+
+    assert ('POST', 'targets') not in sent(fake_acunetix)
+    assert ('POST', 'scans') not in sent(fake_acunetix)
+    assert Checkpoint(file_path=str(tmp_path / 'checkpoint.json')).get(ADDRESS)['stage'] == LifecycleStages.DONE.value
+
+
+def test_target_of_a_timed_out_scan_is_deleted(fake_acunetix, make_orchestrator):
+    answer_scan_lifecycle(fake_acunetix)
+    fake_acunetix.answer('GET', 'scans/s1', (200, {}, scan('processing')))
+    orchestrator = make_orchestrator(scan_timeout=0.05)
+
+    orchestrator.run(addresses=[ADDRESS])
+
+    host = orchestrator.checkpoint.get(ADDRESS)
+    assert host['stage'] == LifecycleStages.PENDING.value
+    assert 'is not finished' in host['error']
+    assert ('DELETE', 'targets/t1') in sent(fake_acunetix)
+    assert ('POST', 'reports') not in sent(fake_acunetix)
+
+
+def test_refused_target_deletion_is_not_checkpointed(fake_acunetix, make_orchestrator):
+    answer_scan_lifecycle(fake_acunetix)
+    fake_acunetix.answer('DELETE', 'targets/t1', (500, {}, b'{}'))
+    orchestrator = make_orchestrator()
+
+    orchestrator.run(addresses=[ADDRESS])
+
+    host = orchestrator.checkpoint.get(ADDRESS)
+    assert host['stage'] == LifecycleStages.ARTIFACTS_REQUESTED.value
+    assert 'Fail to delete the target t1' in host['error']
+    assert ('GET', 'reports/download/r1.html') not in sent(fake_acunetix)
@@ -0,0 +1,98 @@
+import io
+from email.message import Message
+
+import pytest
+
+from api.circuit_breaker import CircuitBreaker, CircuitStates
+from client.body import BodyTee, RequestBody, RequestBodyError
+
+PAYLOAD = b'{"description": "' + b'x' * 100000 + b'"}'
+
+
+def make_headers(**headers) -> Message:
+    message = Message()
+    for name, value in headers.items():
+        message[name.replace('_', '-')] = value
+    return message
+
+
+def chunked(data: bytes, chunk_size: int = 4096) -> bytes:
+    chunks = [data[index:index + chunk_size] for index in range(0, len(data), chunk_size)]
+    return b''.join(b'%x\r\n%s\r\n' % (len(chunk), chunk) for chunk in chunks) + b'0\r\n\r\n'
+
+
+def chunked_body(data: bytes, tee: BodyTee = None) -> RequestBody:
+    return RequestBody(rfile=io.BytesIO(chunked(data)), headers=make_headers(Transfer_Encoding='chunked'), tee=tee)
+
+
+def test_chunked_body_is_decoded_and_copied_to_tee():
+    tee = BodyTee(limit=len(PAYLOAD))
+    assert chunked_body(PAYLOAD, tee=tee).read() == PAYLOAD
+    assert bytes(tee.data) == PAYLOAD
+    assert not tee.is_truncated
+
+
+def test_tee_keeps_only_the_body_prefix():
+    tee = BodyTee(limit=100)
+    assert chunked_body(PAYLOAD, tee=tee).read() == PAYLOAD
+    assert bytes(tee.data) == PAYLOAD[:100]
+    assert tee.is_truncated and tee.size == len(PAYLOAD)
+
+
+@pytest.mark.parametrize('raw', [
+    b'zz\r\nabc\r\n0\r\n\r\n',
+    b'\r\nabc\r\n0\r\n\r\n',
+    b'3\r\nabcdef\r\n0\r\n\r\n',
+    b'10\r\nabc',
+])
+def test_malformed_chunked_body_is_a_client_error(raw):
+    body = RequestBody(rfile=io.BytesIO(raw), headers=make_headers(Transfer_Encoding='chunked'))
+    with pytest.raises(RequestBodyError) as error:
+        list(body.stream())
+    assert error.value.status_code == 400
+
+
+def test_short_or_invalid_content_length_is_a_client_error():
+    with pytest.raises(RequestBodyError):
+        RequestBody(rfile=io.BytesIO(b'abc'), headers=make_headers(Content_Length='10')).read()
+    with pytest.raises(RequestBodyError):
+        RequestBody(rfile=io.BytesIO(b'abc'), headers=make_headers(Content_Length='ten')).read()
+
+
+@pytest.mark.parametrize('make_body', [
+    lambda: chunked_body(PAYLOAD).stream(),
+    lambda: RequestBody(rfile=io.BytesIO(PAYLOAD), headers=make_headers(Content_Length=str(len(PAYLOAD)))).stream(),
+])
+def test_streamed_body_is_framed_after_login(fake_acunetix, make_api, make_body):
+    """ The login answer carries `Content-Length: 0`, it must not be sent with the streamed bodies """
+    api = make_api()
+    api._login()
+    assert 'Content-Length' not in api.session.headers
+    fake_acunetix.answer('POST', 'targets/1/upload', (200, {}, b'{}'))
+
+    response = api.stream_body_request(method='POST', path='targets/1/upload', data=make_body())
+
+    assert response.status_code == 200
+    received = fake_acunetix.received[-1]
+    assert received.error is None
+    assert received.body == PAYLOAD
+
+
+class BrokenSocketFile(io.BytesIO):
+    def read(self, size: int = -1) -> bytes:
+        if self.tell() > 10:
+            raise TimeoutError('timed out')
+        return super().read(min(size, 5) if size and size > 0 else size)
+
+
+def test_downstream_read_error_is_not_an_upstream_failure(fake_acunetix, make_api):
+    breaker = CircuitBreaker(min_calls=1)
+    api = make_api(circuit_breaker=breaker)
+    body = RequestBody(rfile=BrokenSocketFile(PAYLOAD), headers=make_headers(Content_Length=str(len(PAYLOAD))))
+
+    with pytest.raises(RequestBodyError) as error:
+        api.stream_body_request(method='POST', path='targets/1/upload', data=body.stream())
+
+    assert error.value.status_code == 408
+    assert breaker.state == CircuitStates.CLOSED
+    assert not breaker._outcomes
@@ -0,0 +1,136 @@
+import json
+import os
+import time
+from datetime import datetime, timezone, timedelta
+
+from scanner.results_cache import ScanResultsCache
+
+ADDRESS = 'https://example.com/'
+
+
+def completed_scan(scan_id: str, target_id: str, profile_id: str, address: str = ADDRESS, **session) -> dict:
+    return {
+        'scan_id': scan_id, 'target_id': target_id, 'profile_id': profile_id, 'target': {'address': address},
+        'report_template_id': 'template', 'max_scan_time': 0, 'incremental': False,
+        'current_session': {'status': 'completed', 'scan_session_id': f'{scan_id}-result', **session},
+    }
+
+
+def iso_date(seconds_ago: float) -> str:
+    return (datetime.now(timezone.utc) - timedelta(seconds=seconds_ago)).isoformat()
+
+
+def test_results_are_keyed_by_address_and_profile():
+    cache = ScanResultsCache(file_path=None, freshness_seconds=3600)
+    cache.store_scan(scan=completed_scan('s1', 't1', 'p1'), completed_at=time.time())
+
+    assert cache.find(address='HTTPS://Example.com', profile_id='p1').scan_id == 's1'
+    assert cache.find(address=ADDRESS, profile_id='p2') is None
+    assert cache.find_by_target(target_id='t1', profile_id='p2') is None
+    assert cache.find_target_id(address=ADDRESS) == 't1'
+
+
+def test_freshness_is_counted_from_the_end_of_the_scan():
+    cache = ScanResultsCache(file_path=None, freshness_seconds=3600)
+    cache.store_scan(scan=completed_scan('s1', 't1', 'p1'), completed_at=time.time() - 7200)
+
+    assert cache.find(address=ADDRESS, profile_id='p1') is None
+    assert cache.find_target_id(address=ADDRESS) is None
+
+
+def test_removed_targets_and_scans_are_forgotten(tmp_path):
+    file_path = str(tmp_path / 'cache.json')
+    cache = ScanResultsCache(file_path=file_path, freshness_seconds=3600)
+    cache.store_scan(scan=completed_scan('s1', 't1', 'p1'), completed_at=time.time())
+    cache.store_scan(scan=completed_scan('s2', 't2', 'p1', address='https://other.com'), completed_at=time.time())
+
+    cache.forget_target(target_id='t1')
+    cache.forget_scan(scan_id='s2')
+
+    assert not cache.results
+    assert ScanResultsCache(file_path=file_path, freshness_seconds=3600).results == {}
+
+
+def test_scan_end_time_is_taken_from_the_scan_results(proxy, proxy_acunetix):
+    api = proxy.module.api
+    end_date = '2026-01-02T03:04:05+00:00'
+    results = {'results': [{'result_id': 'r0', 'end_date': '2025-01-01T00:00:00+00:00'},
+                           {'result_id': 'r1', 'end_date': end_date}]}
+    proxy_acunetix.answer('GET', 'scans/s1/results', (200, {}, json.dumps(results).encode()))
+
+    assert api.get_scan_end_time(scan_id='s1', result_id='r1') == datetime.fromisoformat(end_date).timestamp()
+    assert api.get_scan_end_time(scan_id='s1', result_id='missing') is None
+
+
+def test_scan_completed_long_ago_is_not_cached(proxy, proxy_acunetix):
+    scan = completed_scan('s1', 't1', 'p1', start_date=iso_date(3 * 3600))
+    proxy_acunetix.answer('GET', 'scans/s1', (200, {}, json.dumps(scan).encode()))
+    proxy_acunetix.answer('GET', 'scans/s1/results', (200, {}, json.dumps(
+        {'results': [{'result_id': 's1-result', 'end_date': iso_date(2 * 3600)}]}).encode()))
+
+    assert proxy.get('scans/s1').status_code == 200
+    assert not proxy.module.results_cache.results
+
+
+def test_removed_target_is_not_reused(proxy, proxy_acunetix):
+    proxy.module.results_cache.store_scan(scan=completed_scan('s1', 't1', 'p1'), completed_at=time.time())
+    proxy_acunetix.answer('GET', 'targets/t1', (404, {}, b'{}'))
+    proxy_acunetix.answer('POST', 'targets', (201, {}, b'{"target_id": "t2", "address": "https://example.com/"}'))
+
+    response = proxy.post('targets?watcher_uuid=watcher', json={'address': ADDRESS})
+
+    assert response.ok
+    assert response.json()['target_id'] == 't2'
+    assert proxy.module.results_cache.find_target_id(address=ADDRESS) is None
+
+
+def test_deleted_target_is_forgotten(proxy, proxy_acunetix):
+    proxy.module.results_cache.store_scan(scan=completed_scan('s1', 't1', 'p1'), completed_at=time.time())
+    proxy_acunetix.answer('GET', 'targets/t1', (200, {}, b'{"target_id": "t1", "address": "https://example.com/"}'))
+
+    response = proxy.post('targets?watcher_uuid=watcher', json={'address': ADDRESS})
+    assert response.json()['target_id'] == 't1'
+
+    proxy_acunetix.answer('GET', 'targets/t1', (404, {}, b'{}'))
+    assert proxy.delete('targets/t1?watcher_uuid=watcher').status_code == 404
+    assert proxy.module.results_cache.find_target_id(address=ADDRESS) is None
+
+
+def test_scan_of_another_profile_is_not_reused(proxy, proxy_acunetix):
+    scan_p1 = completed_scan('s1', 't1', 'p1')
+    scan_p2 = completed_scan('s2', 't1', 'p2')
+    proxy.module.results_cache.store_scan(scan=scan_p1, completed_at=time.time())
+    proxy_acunetix.answer('GET', 'targets/t1', (200, {}, b'{"target_id": "t1"}'))
+    proxy_acunetix.answer('GET', 'scans', (200, {}, json.dumps({'scans': [scan_p1]}).encode()))
+    proxy_acunetix.answer('POST', 'scans', (201, {}, json.dumps(scan_p2).encode()))
+
+    response = proxy.post('scans', json={'target_id': 't1', 'profile_id': 'p2'})
+
+    assert response.json()['scan_id'] == 's2'
+    assert response.json()['profile_id'] == 'p2'
+
+
+def test_reused_target_is_kept_while_another_watcher_uses_it(proxy, proxy_acunetix):
+    proxy_acunetix.answer('POST', 'targets', (201, {}, b'{"target_id": "t1", "address": "https://example.com/"}'))
+    proxy_acunetix.answer('GET', 'targets/t1', (200, {}, b'{"target_id": "t1", "address": "https://example.com/"}'))
+    assert proxy.post('targets?watcher_uuid=first', json={'address': ADDRESS}).json()['target_id'] == 't1'
+    proxy.module.results_cache.store_scan(scan=completed_scan('s1', 't1', 'p1'), completed_at=time.time())
+
+    assert proxy.post('targets?watcher_uuid=second', json={'address': ADDRESS}).json()['target_id'] == 't1'
+    assert proxy.delete('targets/t1?watcher_uuid=first').ok
+
+    assert ('DELETE', 'targets/t1') not in [(request.method, request.path) for request in proxy_acunetix.received]
+    assert proxy.module.results_cache.find_target_id(address=ADDRESS) == 't1'
+
+
+def test_saves_do_not_share_a_temporary_file(tmp_path, monkeypatch):
+    file_path = str(tmp_path / 'cache.json')
+    cache = ScanResultsCache(file_path=file_path, freshness_seconds=3600)
+    replaced = []
+    monkeypatch.setattr('scanner.results_cache.os.replace', lambda src, dst: replaced.append(src))
+
+    cache.store_scan(scan=completed_scan('s1', 't1', 'p1'), completed_at=time.time())
+    cache.store_scan(scan=completed_scan('s2', 't2', 'p1', address='https://other.com'), completed_at=time.time())
+
+    assert len(set(replaced)) == 2
+    assert all(os.path.dirname(path) == str(tmp_path) for path in replaced)
@@ -0,0 +1,51 @@
+import pytest
+
+from api.admission import RequestPriority
+from client.routes import ROUTES, RouteTable
+
+
+@pytest.mark.parametrize('method, path, handler, params', [
+    ('GET', 'scans/abc', '_handle_scan_reading', {'scan_id': 'abc'}),
+    ('GET', 'scans/abc/results', '_handle_proxy', {}),
+    ('GET', 'reports/download/file.pdf', '_handle_proxy', {'descriptor': 'file.pdf'}),
+    ('POST', 'targets', '_handle_target_creating', {}),
+    ('POST', 'targets/abc/configuration', '_handle_proxy', {}),
+    ('DELETE', 'targets/abc', '_handle_target_deleting', {'target_id': 'abc'}),
+    ('DELETE', 'scans/abc', '_handle_scan_deleting', {'scan_id': 'abc'}),
+])
+def test_requests_are_dispatched_to_their_handlers(method, path, handler, params):
+    route, route_params = ROUTES.match(method=method, route_path=path)
+    assert route.handler == handler
+    assert route_params == params
+
+
+def test_route_policies():
+    assert ROUTES.match(method='POST', route_path='targets')[0].policy.requires_watcher
+    assert ROUTES.match(method='POST', route_path='targets/abc/upload')[0].policy.streaming
+    assert ROUTES.match(method='POST', route_path='me/login')[0].policy.priority == RequestPriority.HIGH
+
+
+def test_unknown_method_has_no_route():
+    assert ROUTES.match(method='PUT', route_path='targets') == (None, {})
+
+
+def test_parametrized_routes_are_matched_in_registration_order():
+    routes = RouteTable()
+    routes.add('GET', 'scans/{scan_id}/results', 'results')
+    routes.add('GET', 'scans/{scan_id}', 'scan')
+    routes.add('GET', '*', 'default')
+
+    assert routes.match(method='GET', route_path='scans/1/results')[0].handler == 'results'
+    assert routes.match(method='GET', route_path='scans/1')[0].handler == 'scan'
+    assert routes.match(method='GET', route_path='scans/1/other')[0].handler == 'default'
+    assert routes.match(method='GET', route_path='scans.1')[0].handler == 'default'
+
+
+def test_watcher_is_stored_under_its_uuid(proxy, proxy_acunetix):
+    proxy_acunetix.answer('POST', 'targets', (201, {}, b'{"target_id": "t1", "address": "http://example.com"}'))
+
+    response = proxy.post('targets?watcher_uuid=abc&other=1', json={'address': 'http://example.com'})
+
+    assert response.ok
+    assert [watcher.uuid for watcher in proxy.module.targets_queue.watchers] == ['abc']
+    assert [watcher.uuid for watcher in proxy.module.targets_queue.targets[0].watchers] == ['abc']
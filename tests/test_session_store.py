@@ -0,0 +1,37 @@
+import pytest
+
+from api.exceptions import SessionLoginTimeout
+from core.state import SessionStore
+
+
+def test_only_one_worker_logs_in_for_a_session_version():
+    store = SessionStore()
+    token = store.begin_login(seen_version=0)
+    assert token
+
+    assert store.finish_login(token, headers={'X-Auth': 'token'}, cookies={}) == 1
+    # the session was renewed while the second worker was waiting: it adopts it
+    assert store.begin_login(seen_version=0) is None
+    assert store.get_session() == (1, {'X-Auth': 'token'}, {})
+
+
+def test_failed_lock_wait_is_an_error():
+    store = SessionStore()
+    store.LOGIN_TIMEOUT = 0.01
+    assert store.begin_login(seen_version=0)
+
+    with pytest.raises(SessionLoginTimeout):
+        store.begin_login(seen_version=0)
+
+
+def test_only_the_lock_holder_releases_it():
+    store = SessionStore()
+    store.LOGIN_TIMEOUT = 0.01
+    token = store.begin_login(seen_version=0)
+
+    assert store.finish_login('another-token', headers={'X-Auth': 'stolen'}, cookies={}) == 0
+    with pytest.raises(SessionLoginTimeout):
+        store.begin_login(seen_version=0)
+
+    store.finish_login(token, headers={'X-Auth': 'token'}, cookies={})
+    assert store.begin_login(seen_version=1)
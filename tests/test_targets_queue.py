@@ -0,0 +1,84 @@
+import threading
+import time
+
+from core.state import StateManager
+from scanner.scanner_base import TargetsQueue
+
+
+def create_concurrently(queue, address: str, creators: int) -> list[str | None]:
+    """ Every creator reserves the target creation, the reserving one creates the target upstream """
+    tokens = []
+
+    def create():
+        token = queue.begin_target_creating(address=address)
+        tokens.append(token)
+        if token:
+            time.sleep(0.2)
+            queue.set_target_id(address=address, target_id='t1')
+            queue.finish_target_creating(address=address, token=token)
+
+    threads = [threading.Thread(target=create) for _ in range(creators)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return tokens
+
+
+def test_only_one_request_creates_the_target():
+    queue = TargetsQueue()
+    queue.check_target(target={'address': 'http://x/'}, watcher=queue.get_watcher('watcher'))
+
+    tokens = create_concurrently(queue, address='http://X', creators=8)
+
+    assert len([token for token in tokens if token]) == 1
+    assert queue.get_target(address='x').target_id == 't1'
+
+
+def test_failed_creation_is_retried_by_the_next_request():
+    queue = TargetsQueue()
+    queue.check_target(target={'address': 'http://x/'}, watcher=queue.get_watcher('watcher'))
+    token = queue.begin_target_creating(address='http://x/')
+    queue.finish_target_creating(address='http://x/', token=token)
+
+    assert queue.begin_target_creating(address='http://x/')
+
+
+def test_stale_reservation_is_taken_over():
+    queue = TargetsQueue()
+    queue.CREATING_TIMEOUT = 0.05
+    assert queue.begin_target_creating(address='http://x/')
+    assert queue.begin_target_creating(address='http://x/')
+
+
+def test_workers_share_the_reservation_through_the_state_service(tmp_path):
+    manager = StateManager(address=str(tmp_path / 'state.sock'))
+    manager.start()
+    try:
+        queue = manager.get_targets_queue()
+        queue.check_target(target={'address': 'http://x/'}, watcher=queue.get_watcher('watcher'))
+
+        tokens = create_concurrently(queue, address='http://x/', creators=4)
+
+        assert len([token for token in tokens if token]) == 1
+    finally:
+        manager.shutdown()
+
+
+def test_concurrent_watchers_create_one_target_upstream(proxy, proxy_acunetix):
+    proxy_acunetix.answer('POST', 'targets', (201, {}, b'{"target_id": "t1", "address": "http://x/"}'))
+    proxy_acunetix.delays[('POST', 'targets')] = 0.5
+    responses = []
+
+    def create(number: int):
+        responses.append(proxy.post(f'targets?watcher_uuid=watcher-{number}', json={'address': 'http://x/'}))
+
+    threads = [threading.Thread(target=create, args=(number,)) for number in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert [request.method for request in proxy_acunetix.received].count('POST') == 1
+    assert sorted(response.json()['target_id'] for response in responses) == ['t1'] * 8
+    assert len(proxy.module.targets_queue.get_target(address='http://x/').watchers) == 8